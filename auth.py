@@ -2,31 +2,35 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import os, secrets, time
 
-import crud, models, schemas
-from database import get_db
+import crud, crud_async, models, schemas
+from database import AsyncSessionLocal, SessionLocal, get_db
+from hashing import pwd_context, verify_password, get_password_hash
 
 # --- Configuración de Seguridad ---
 SECRET_KEY = "tu_clave_secreta_super_segura_y_larga" # ¡Cámbiala por una clave real y guárdala segura!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Contexto para hashear contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Esquema de autenticación
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# --- Funciones de Utilidad ---
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Caché de principales: tamaño máximo y TTL (nunca más allá del "exp" del token)
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+# Vida de los tickets de un solo uso para abrir el canal SSE desde el navegador
+TICKET_EVENTOS_TTL_SECONDS = int(os.getenv("TICKET_EVENTOS_TTL_SECONDS", "30"))
 
+# --- Funciones de Utilidad ---
+# El hashing de contraseñas vive en hashing.py (pool dedicado); se re-exporta aquí por compatibilidad.
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -34,22 +38,164 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# --- Caché de principales autenticados ---
+@dataclass(frozen=True)
+class Principal:
+    """Identidad ligera del usuario autenticado (lo único que necesitan las rutas)."""
+    id: int
+    email: str
+
+class PrincipalCache:
+    """LRU en proceso: token verificado -> Principal, con caducidad por entrada."""
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # token -> (principal, expira_en)
+        self._tokens_by_user = {}      # user_id -> {tokens}, para invalidar por usuario
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None: self._drop(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, principal: Principal, token_exp: float):
+        if self.max_size <= 0: return
+        expires_at = min(token_exp, time.time() + self.ttl_seconds)
+        with self._lock:
+            if token in self._entries: self._drop(token)
+            self._entries[token] = (principal, expires_at)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: Optional[int] = None, email: Optional[str] = None):
+        """Descarta todos los tokens cacheados de un usuario (por id o por email)."""
+        with self._lock:
+            if user_id is None and email is not None:
+                user_id = next((p.id for p, _ in self._entries.values() if p.email == email), None)
+            for token in list(self._tokens_by_user.get(user_id, ())): self._drop(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "hit_ratio": round(self.hits / total, 4) if total else 0.0}
+
+    def _drop(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens: del self._tokens_by_user[principal.id]
+
+principal_cache = PrincipalCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_user(user_id: Optional[int] = None, email: Optional[str] = None):
+    principal_cache.invalidate_user(user_id=user_id, email=email)
+
 # --- Dependencia para obtener el usuario actual ---
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str):
+    credentials_exception = _credentials_exception()
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or "uso" in payload:  # un ticket de eventos no vale como token de acceso
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
+    return token_data, payload["exp"]
+
+def _cache_principal(token: str, user: models.User, token_exp: float) -> Principal:
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+    principal = Principal(id=user.id, email=user.email)
+    principal_cache.put(token, principal, token_exp=token_exp)
+    return principal
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    # Acierto en caché: el token ya fue verificado y el usuario existe; no hay consulta a la BD
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    token_data, token_exp = _decode_token(token)
+    user = crud.get_user_by_email(db, email=token_data.email)
+    return _cache_principal(token, user, token_exp)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Igual que get_current_user, para las rutas async: no ocupa un hilo del threadpool."""
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    token_data, token_exp = _decode_token(token)
+    async with AsyncSessionLocal() as db:
+        user = await crud_async.get_user_by_email(db, email=token_data.email)
+    return _cache_principal(token, user, token_exp)
+
+def _get_user_sync(email: str):
+    db = SessionLocal()
+    try:
+        return crud.get_user_by_email(db, email=email)
+    finally:
+        db.close()
+
+def principal_from_token(token: str) -> Principal:
+    """Para canales que no pasan por la dependencia (WebSocket, con el token en Sec-WebSocket-Protocol)."""
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    token_data, token_exp = _decode_token(token)
+    return _cache_principal(token, _get_user_sync(token_data.email), token_exp)
+
+# --- Tickets de eventos ---
+# EventSource no permite cabeceras, así que el navegador abre el SSE con ?ticket=: un JWT propio que
+# caduca en segundos, se consume una sola vez y no sirve como token de acceso. Si acaba en un log de
+# accesos ya no vale. El registro de tickets usados es por proceso: firma y caducidad bastan entre workers.
+_tickets_usados: Dict[str, float] = {}  # jti -> exp
+_tickets_lock = Lock()
+
+def crear_ticket_eventos(principal: Principal, token: str) -> str:
+    sesion_exp = token_expiration(token)
+    return jwt.encode({"sub": principal.email, "uso": "eventos", "jti": secrets.token_urlsafe(16), "sesion_exp": sesion_exp,
+                       "exp": min(sesion_exp, time.time() + TICKET_EVENTOS_TTL_SECONDS)}, SECRET_KEY, algorithm=ALGORITHM)
+
+def principal_from_ticket(ticket: str) -> Tuple[Principal, float]:
+    """(Principal, exp del token de sesión con el que se emitió). Consume el ticket."""
+    try:
+        payload = jwt.decode(ticket, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _credentials_exception()
+    if payload.get("uso") != "eventos" or not payload.get("jti"): raise _credentials_exception()
+    ahora = time.time()
+    with _tickets_lock:
+        for jti in [j for j, exp in _tickets_usados.items() if exp <= ahora]: del _tickets_usados[jti]
+        if payload["jti"] in _tickets_usados: raise _credentials_exception()
+        _tickets_usados[payload["jti"]] = payload["exp"]
+    user = _get_user_sync(payload["sub"])
+    if user is None: raise _credentials_exception()
+    return Principal(id=user.id, email=user.email), payload["sesion_exp"]
+
+def token_expiration(token: str) -> float:
+    """exp de un token ya validado (para cerrar los canales largos cuando caduca)."""
+    return jwt.get_unverified_claims(token)["exp"]
@@ -0,0 +1,287 @@
+# benchmarks/carga.py
+# Suite de carga de la API. Arranca la app en este proceso (ASGI directo o uvicorn en un hilo) contra una
+# SQLite temporal, siembra datos realistas y lanza escenarios concurrentes con httpx:
+#
+#   login      tormenta de POST /token (hashing bcrypt)
+#   listado    lecturas paginadas de GET /tareas
+#   mixto      lecturas, altas, ediciones y borrados entremezclados
+#   asignacion altas y bajas de asignados sobre tareas propias
+#
+# Por escenario informa req/s, p50/p95/p99 y consultas SQL por petición, y guarda el resultado en JSON.
+# Con --comparar se contrasta contra una ejecución anterior y se sale con código 1 si hay regresión.
+#
+#   python benchmarks/carga.py --concurrencia 50 --peticiones 2000
+#   python benchmarks/carga.py --comparar benchmarks/resultados/base.json --umbral 0.15
+import argparse, asyncio, json, os, platform, random, socket, subprocess, sys, tempfile, threading, time
+from datetime import datetime, timezone
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESCENARIOS = ("login", "listado", "mixto", "asignacion")
+PASSWORD = "bench"
+
+# --- Contador de consultas SQL (todas las conexiones del proceso) ---
+class ContadorSQL:
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock: self.total += 1
+
+# --- Arranque de la app ---
+def importar_app(url_bd: str, bcrypt_rounds: int):
+    # La configuración se lee del entorno al importar: hay que fijarla antes de importar main
+    os.environ["DATABASE_URL"] = url_bd
+    os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    import main
+    return main
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ServidorUvicorn:
+    """uvicorn en un hilo de este proceso, para que el contador SQL vea sus consultas."""
+    def __init__(self, app):
+        import uvicorn
+        self.puerto = puerto_libre()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.puerto, log_level="warning"))
+        self.hilo = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        while not self.server.started:
+            if not self.hilo.is_alive(): raise RuntimeError("El servidor no arrancó")
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{self.puerto}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.hilo.join()
+
+# --- Datos de prueba ---
+def sembrar(usuarios: int, tareas_por_usuario: int, asignados_por_tarea: int, semilla: int):
+    """Inserta usuarios, tareas y asignaciones directamente en la BD. Devuelve {email: [ids de sus tareas]}."""
+    from sqlalchemy import insert, select
+    import database, models
+    from hashing import get_password_hash
+    rnd = random.Random(semilla)
+    hashed = get_password_hash(PASSWORD)  # mismo hash para todos: sembrar no debe medir bcrypt
+    emails = [f"bench{i}@example.com" for i in range(usuarios)]
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.User), [{"email": e, "hashed_password": hashed} for e in emails])
+        user_ids = dict(conn.execute(select(models.User.email, models.User.id)).all())
+        filas = [{"titulo": f"Tarea {j} de {e}", "descripcion": rnd.choice(("revisar informe", "preparar reunión", "llamar al cliente",
+                                                                             "actualizar documentación", "corregir error en producción")),
+                  "completada": rnd.random() < 0.3, "creator_id": user_ids[e]} for e in emails for j in range(tareas_por_usuario)]
+        tarea_ids = conn.execute(insert(models.Tarea).returning(models.Tarea.id, models.Tarea.creator_id, sort_by_parameter_order=True), filas).all()
+        todos = list(user_ids.values())
+        asignaciones = []
+        for tarea_id, creator_id in tarea_ids:
+            asignados = {creator_id, *rnd.sample(todos, min(asignados_por_tarea, len(todos)))}
+            asignaciones.extend({"task_id": tarea_id, "user_id": u} for u in asignados)
+        conn.execute(insert(models.task_assignments), asignaciones)
+    por_id = {user_id: email for email, user_id in user_ids.items()}
+    propias = {e: [] for e in emails}
+    for tarea_id, creator_id in tarea_ids: propias[por_id[creator_id]].append(tarea_id)
+    return propias
+
+async def obtener_tokens(cliente: httpx.AsyncClient, emails):
+    cabeceras = {}
+    for email in emails:
+        r = await cliente.post("/token", data={"username": email, "password": PASSWORD})
+        r.raise_for_status()
+        cabeceras[email] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    return cabeceras
+
+# --- Escenarios ---
+# Cada escenario es una corrutina (cliente, i, rnd) -> respuesta; i es el número de petición.
+def escenario_login(ctx):
+    async def paso(cliente, i, rnd):
+        return await cliente.post("/token", data={"username": rnd.choice(ctx["emails"]), "password": PASSWORD})
+    return paso
+
+def escenario_listado(ctx):
+    async def paso(cliente, i, rnd):
+        email = rnd.choice(ctx["emails"])
+        r = await cliente.get("/tareas?limite=100", headers=ctx["cabeceras"][email])
+        cursor = r.headers.get("X-Siguiente-Cursor")
+        if cursor and rnd.random() < 0.3:  # parte de los clientes pasa a la segunda página
+            r = await cliente.get(f"/tareas?limite=100&despues_de={cursor}", headers=ctx["cabeceras"][email])
+        return r
+    return paso
+
+def escenario_mixto(ctx):
+    creadas = {e: [] for e in ctx["emails"]}
+    async def paso(cliente, i, rnd):
+        email = rnd.choice(ctx["emails"])
+        h, tirada = ctx["cabeceras"][email], rnd.random()
+        if tirada < 0.5:
+            return await cliente.get("/tareas?limite=50", headers=h)
+        if tirada < 0.75 or not creadas[email]:
+            r = await cliente.post("/tareas", json={"titulo": f"nueva {i}", "descripcion": "escenario mixto"}, headers=h)
+            if r.status_code == 200: creadas[email].append(r.json()["id"])
+            return r
+        if tirada < 0.9:
+            tarea_id = rnd.choice(ctx["propias"][email] or creadas[email])
+            return await cliente.put(f"/tareas/{tarea_id}", json={"titulo": f"editada {i}", "descripcion": "escenario mixto",
+                                                                  "completada": rnd.random() < 0.5}, headers=h)
+        return await cliente.delete(f"/tareas/{creadas[email].pop()}", headers=h)
+    return paso
+
+def escenario_asignacion(ctx):
+    asignadas = {e: [] for e in ctx["emails"]}
+    creadores = [e for e in ctx["emails"] if ctx["propias"][e]]
+    async def paso(cliente, i, rnd):
+        email = rnd.choice(creadores)
+        h = ctx["cabeceras"][email]
+        if asignadas[email] and rnd.random() < 0.5:
+            tarea_id, otro = asignadas[email].pop(rnd.randrange(len(asignadas[email])))
+            return await cliente.post(f"/tareas/{tarea_id}/unassign", json={"email": otro}, headers=h)
+        tarea_id, otro = rnd.choice(ctx["propias"][email]), rnd.choice(ctx["emails"])
+        if otro != email: asignadas[email].append((tarea_id, otro))
+        return await cliente.post(f"/tareas/{tarea_id}/assign", json={"email": otro}, headers=h)
+    return paso
+
+FABRICAS = {"login": escenario_login, "listado": escenario_listado, "mixto": escenario_mixto, "asignacion": escenario_asignacion}
+
+def percentil(ordenadas, p: float) -> float:
+    if not ordenadas: return 0.0
+    return ordenadas[min(len(ordenadas) - 1, max(0, int(round(p / 100 * len(ordenadas))) - 1))]
+
+async def ejecutar_escenario(cliente, paso, peticiones: int, concurrencia: int, contador: ContadorSQL, semilla: int):
+    latencias, errores, rechazadas = [], 0, 0
+    cola = iter(range(peticiones))
+
+    async def trabajador(n: int):
+        nonlocal errores, rechazadas
+        rnd = random.Random(semilla * 1000 + n)
+        for i in cola:
+            t0 = time.perf_counter()
+            try:
+                r = await paso(cliente, i, rnd)
+                if r.status_code == 503: rechazadas += 1  # control de admisión (p. ej. pool de hashing lleno)
+                elif r.status_code >= 400: errores += 1
+            except httpx.HTTPError:
+                errores += 1
+            latencias.append(time.perf_counter() - t0)
+
+    consultas_antes = contador.total
+    t0 = time.perf_counter()
+    await asyncio.gather(*(trabajador(n) for n in range(concurrencia)))
+    duracion = time.perf_counter() - t0
+    latencias.sort()
+    return {"peticiones": peticiones, "errores": errores, "rechazadas_503": rechazadas, "duracion_s": round(duracion, 3),
+            "rps": round(peticiones / duracion, 1),
+            "p50_ms": round(percentil(latencias, 50) * 1000, 2), "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+            "sql_por_peticion": round((contador.total - consultas_antes) / peticiones, 2)}
+
+async def ejecutar(app, base_url, args, propias, contador):
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    transporte = httpx.ASGITransport(app=app) if base_url is None else None
+    async with httpx.AsyncClient(base_url=base_url or "http://bench", transport=transporte, limits=limites, timeout=120) as cliente:
+        emails = sorted(propias)
+        ctx = {"emails": emails, "propias": propias, "cabeceras": await obtener_tokens(cliente, emails)}
+        resultados = {}
+        for n, nombre in enumerate(args.escenarios.split(",")):
+            paso = FABRICAS[nombre](ctx)
+            await ejecutar_escenario(cliente, paso, min(args.calentamiento, args.peticiones), args.concurrencia, contador, args.semilla + n)
+            resultados[nombre] = await ejecutar_escenario(cliente, paso, args.peticiones, args.concurrencia, contador, args.semilla + n)
+            print_fila(nombre, resultados[nombre])
+        return resultados
+
+# --- Informe y comparación ---
+def print_cabecera():
+    print(f"{'escenario':<11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL/req':>8} {'errores':>8} {'503':>6}")
+
+def print_fila(nombre, r):
+    print(f"{nombre:<11} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+          f"{r['sql_por_peticion']:>8.2f} {r['errores']:>8} {r['rechazadas_503']:>6}")
+
+def comparar(base: dict, actual: dict, umbral: float):
+    """Devuelve la lista de regresiones: req/s cae, o p95 o SQL/req suben, más de `umbral` (fracción) respecto a la base."""
+    regresiones = []
+    print(f"\nComparación con {base.get('fecha', '?')} ({base.get('commit') or 'sin commit'}), umbral {umbral:.0%}")
+    for nombre, r in actual["escenarios"].items():
+        b = base.get("escenarios", {}).get(nombre)
+        if b is None: continue
+        d_rps, d_p95 = r["rps"] / b["rps"] - 1, r["p95_ms"] / b["p95_ms"] - 1
+        print(f"{nombre:<11} req/s {d_rps:+7.1%}   p95 {d_p95:+7.1%}   SQL/req {b['sql_por_peticion']:.2f} -> {r['sql_por_peticion']:.2f}")
+        if d_rps < -umbral: regresiones.append(f"{nombre}: req/s {b['rps']} -> {r['rps']}")
+        if d_p95 > umbral: regresiones.append(f"{nombre}: p95 {b['p95_ms']} ms -> {r['p95_ms']} ms")
+        if r["sql_por_peticion"] > b["sql_por_peticion"] * (1 + umbral):
+            regresiones.append(f"{nombre}: SQL/req {b['sql_por_peticion']} -> {r['sql_por_peticion']}")
+    return regresiones
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de carga de la API de tareas")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS), help=f"Separados por comas: {', '.join(ESCENARIOS)}")
+    parser.add_argument("--servidor", choices=("asgi", "uvicorn"), default="asgi",
+                        help="asgi: peticiones directas a la app; uvicorn: HTTP real contra uvicorn en un hilo")
+    parser.add_argument("--async", dest="modo_async", action="store_true", help="Usar el modo DATABASE_ASYNC (aiosqlite)")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=1000, help="Peticiones medidas por escenario")
+    parser.add_argument("--calentamiento", type=int, default=100, help="Peticiones previas sin medir por escenario")
+    parser.add_argument("--usuarios", type=int, default=100)
+    parser.add_argument("--tareas-por-usuario", type=int, default=100)
+    parser.add_argument("--asignados-por-tarea", type=int, default=3)
+    parser.add_argument("--bcrypt-rounds", type=int, default=8)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Fichero JSON de resultados (por defecto benchmarks/resultados/<fecha>.json)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con la que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Regresión tolerada (fracción) en req/s, p95 y SQL/req")
+    args = parser.parse_args()
+    desconocidos = set(args.escenarios.split(",")) - set(ESCENARIOS)
+    if desconocidos: parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        driver = "sqlite+aiosqlite" if args.modo_async else "sqlite"
+        main_app = importar_app(f"{driver}:///{tmp}/bench.db", args.bcrypt_rounds)
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        contador = ContadorSQL()
+        event.listen(Engine, "before_cursor_execute", contador)
+
+        t0 = time.perf_counter()
+        propias = sembrar(args.usuarios, args.tareas_por_usuario, args.asignados_por_tarea, args.semilla)
+        print(f"Sembrados {args.usuarios} usuarios y {args.usuarios * args.tareas_por_usuario} tareas en {time.perf_counter() - t0:.1f} s "
+              f"(servidor={args.servidor}, modo={'async' if args.modo_async else 'sync'}, concurrencia={args.concurrencia})")
+        print_cabecera()
+        if args.servidor == "uvicorn":
+            with ServidorUvicorn(main_app.app) as base_url:
+                escenarios = asyncio.run(ejecutar(main_app.app, base_url, args, propias, contador))
+        else:
+            escenarios = asyncio.run(ejecutar(main_app.app, None, args, propias, contador))
+
+    resultado = {"fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": commit_actual(),
+                 "python": platform.python_version(), "cpus": os.cpu_count(),
+                 "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar", "umbral")},
+                 "escenarios": escenarios}
+    salida = args.salida or os.path.join(RAIZ, "benchmarks", "resultados", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f: json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f: base = json.load(f)
+        if base.get("parametros") != resultado["parametros"]:
+            print("Aviso: la ejecución base usó otros parámetros; la comparación puede no ser significativa")
+        regresiones = comparar(base, resultado, args.umbral)
+        if regresiones:
+            print("\nREGRESIONES:\n  " + "\n  ".join(regresiones))
+            sys.exit(1)
+        print("Sin regresiones")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/comparar_sync_async.py
+# Comparación de throughput entre el modo síncrono y el modo async (DATABASE_ASYNC) a alta concurrencia.
+# Levanta uvicorn dos veces contra una SQLite temporal, siembra datos y lanza la misma carga a ambos.
+#
+#   python benchmarks/comparar_sync_async.py --concurrencia 200 --peticiones 4000
+import argparse, asyncio, os, statistics, subprocess, sys, tempfile, time
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def levantar_servidor(url_bd: str, puerto: int):
+    env = {**os.environ, "DATABASE_URL": url_bd, "BCRYPT_ROUNDS": "4"}
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+                            cwd=RAIZ, env=env)
+    for _ in range(100):
+        try:
+            if httpx.get(f"http://127.0.0.1:{puerto}/health").status_code == 200: return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("El servidor no arrancó")
+
+async def sembrar(cliente: httpx.AsyncClient, usuarios: int, tareas_por_usuario: int):
+    cabeceras = []
+    for i in range(usuarios):
+        email = f"bench{i}@example.com"
+        await cliente.post("/users/register", json={"email": email, "password": "bench"})
+        r = await cliente.post("/token", data={"username": email, "password": "bench"})
+        cabeceras.append({"Authorization": f"Bearer {r.json()['access_token']}"})
+    for h in cabeceras:
+        for j in range(tareas_por_usuario):
+            await cliente.post("/tareas", json={"titulo": f"t{j}", "descripcion": "bench"}, headers=h)
+    return cabeceras
+
+async def cargar(base_url: str, concurrencia: int, peticiones: int, usuarios: int, tareas_por_usuario: int):
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=60) as cliente:
+        cabeceras = await sembrar(cliente, usuarios, tareas_por_usuario)
+        latencias, errores = [], 0
+        cola = iter(range(peticiones))
+
+        async def trabajador():
+            nonlocal errores
+            for i in cola:
+                h = cabeceras[i % len(cabeceras)]
+                t0 = time.perf_counter()
+                try:
+                    # 90 % lecturas del listado, 10 % escrituras
+                    if i % 10: r = await cliente.get("/tareas?limite=50", headers=h)
+                    else: r = await cliente.post("/tareas", json={"titulo": "w", "descripcion": "bench"}, headers=h)
+                    if r.status_code >= 400: errores += 1
+                except httpx.HTTPError:
+                    errores += 1
+                latencias.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+        total = time.perf_counter() - t0
+    latencias.sort()
+    return {"rps": peticiones / total, "p50_ms": statistics.median(latencias) * 1000,
+            "p99_ms": latencias[int(len(latencias) * 0.99) - 1] * 1000, "errores": errores}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrencia", type=int, default=200)
+    parser.add_argument("--peticiones", type=int, default=4000)
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--tareas-por-usuario", type=int, default=50)
+    parser.add_argument("--modos", default="sync,async", help="Modos a medir, separados por comas")
+    args = parser.parse_args()
+    resultados = {}
+    for modo, driver, puerto in (("sync", "sqlite", 8101), ("async", "sqlite+aiosqlite", 8102)):
+        if modo not in args.modos.split(","): continue
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = levantar_servidor(f"{driver}:///{tmp}/bench.db", puerto)
+            try:
+                resultados[modo] = asyncio.run(cargar(f"http://127.0.0.1:{puerto}", args.concurrencia, args.peticiones,
+                                                      args.usuarios, args.tareas_por_usuario))
+            finally:
+                proc.terminate(); proc.wait()
+    print(f"concurrencia={args.concurrencia} peticiones={args.peticiones}")
+    print(f"{'modo':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    for modo, r in resultados.items():
+        print(f"{modo:<6} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errores']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/serializacion.py
+# Microbenchmark del coste por tarea de una página de GET /tareas, sin HTTP de por medio:
+#
+#   antes    objetos ORM (selectinload) -> validación contra schemas.Tarea -> volcado a JSON -> json
+#            (lo que hacía FastAPI con el response_model)
+#   ahora    filas -> dicts (crud.get_tareas_for_user) -> serializacion.dumps con orjson
+#   ahora sin orjson   lo mismo con el json de la biblioteca estándar
+#
+# Mide por separado la consulta (filas/objetos) y la serialización, en microsegundos por tarea.
+#
+#   python benchmarks/serializacion.py --tareas 500 --asignados-por-tarea 3
+import argparse, json, os, statistics, sys, tempfile, time, warnings
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def importar(url_bd: str):
+    # La configuración se lee del entorno al importar: hay que fijarla antes de importar main
+    os.environ["DATABASE_URL"] = url_bd
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    import main  # crea las tablas y el índice de búsqueda
+    import crud, database, models, schemas, serializacion
+    return crud, database, models, schemas, serializacion
+
+def sembrar(database, models, tareas: int, asignados_por_tarea: int) -> int:
+    with database.SessionLocal() as db:
+        usuarios = [{"id": i, "email": f"bench{i}@example.com", "hashed_password": "x"} for i in range(1, asignados_por_tarea + 2)]
+        db.execute(models.User.__table__.insert(), usuarios)
+        db.execute(models.Tarea.__table__.insert(), [{"id": i, "titulo": f"Tarea {i} ñ", "descripcion": "descripción " * 10,
+                                                      "completada": i % 2 == 0, "creator_id": usuarios[0]["id"]} for i in range(1, tareas + 1)])
+        db.execute(models.task_assignments.insert(), [{"task_id": t, "user_id": u["id"]} for t in range(1, tareas + 1)
+                                                      for u in usuarios[:asignados_por_tarea]])
+        db.commit()
+    return usuarios[0]["id"]
+
+def medir(funcion, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste por tarea de la serialización de GET /tareas")
+    parser.add_argument("--tareas", type=int, default=500, help="Tareas por página (máximo de la API: 500)")
+    parser.add_argument("--asignados-por-tarea", type=int, default=3)
+    parser.add_argument("--repeticiones", type=int, default=30)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")  # orm_mode avisa de deprecación en pydantic 2
+
+    tmp = tempfile.mkdtemp(prefix="serializacion-")
+    crud, database, models, schemas, serializacion = importar(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    from typing import List
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    user_id = sembrar(database, models, args.tareas, args.asignados_por_tarea)
+    db = database.SessionLocal()
+
+    def objetos_orm():
+        stmt = select(models.Tarea).options(selectinload(models.Tarea.assignees)).where(crud.visible_para(user_id)) \
+            .order_by(models.Tarea.id).limit(args.tareas)
+        resultado = db.execute(stmt).scalars().all()
+        db.expunge_all()  # que cada repetición cargue de nuevo, como una petición con sesión propia
+        return resultado
+
+    def dicts():
+        return crud.get_tareas_for_user(db, user_id, limite=args.tareas)
+
+    try:  # pydantic 2: el mismo TypeAdapter que usa FastAPI para el response_model
+        from pydantic import TypeAdapter
+        adaptador = TypeAdapter(List[schemas.Tarea])
+        def validar_y_codificar(objetos): return adaptador.dump_python(adaptador.validate_python(objetos, from_attributes=True), mode="json")
+    except ImportError:
+        from fastapi.encoders import jsonable_encoder
+        def validar_y_codificar(objetos): return jsonable_encoder([schemas.Tarea.from_orm(t) for t in objetos])
+
+    orm, filas = objetos_orm(), dicts()
+    assert len(orm) == len(filas) == args.tareas
+    def json_antes(): return json.dumps(validar_y_codificar(orm), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    def json_ahora(): return serializacion.dumps(filas)
+    def json_stdlib():
+        orjson, serializacion.orjson = serializacion.orjson, None
+        try: return serializacion.dumps(filas)
+        finally: serializacion.orjson = orjson
+    assert json.loads(json_antes()) == json.loads(json_ahora()) == json.loads(json_stdlib())
+
+    variantes = [("antes", objetos_orm, json_antes), ("ahora", dicts, json_ahora)]
+    if serializacion.orjson is not None: variantes.append(("ahora sin orjson", dicts, json_stdlib))
+    else: print("orjson no está instalado: 'ahora' usa el json de la biblioteca estándar")
+    print(f"{args.tareas} tareas x {args.asignados_por_tarea} asignados, mediana de {args.repeticiones} repeticiones (µs por tarea)")
+    print(f"{'':18}{'consulta':>10}{'serializar':>12}{'total':>10}")
+    base = None
+    for nombre, consulta, serializar in variantes:
+        c = medir(consulta, args.repeticiones) / args.tareas * 1e6
+        s = medir(serializar, args.repeticiones) / args.tareas * 1e6
+        base = base or c + s
+        print(f"{nombre:18}{c:10.1f}{s:12.1f}{c + s:10.1f}   x{base / (c + s):.1f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
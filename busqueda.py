@@ -0,0 +1,70 @@
+# busqueda.py
+# Búsqueda de texto completo sobre titulo y descripcion de las tareas.
+#  - SQLite: tabla virtual FTS5 de contenido externo, sincronizada con triggers (create/update/delete,
+#    incluidas las operaciones en lote, que no pasan por el ORM).
+#  - PostgreSQL: índice GIN sobre la misma expresión to_tsvector que usa la consulta; se mantiene solo.
+#  - Otros dialectos: LIKE sin índice, para no romper la API.
+from sqlalchemy import func, literal_column, select, table, column, text
+from sqlalchemy.engine import Engine
+import models
+
+# La consulta debe usar exactamente esta expresión para que PostgreSQL aproveche el índice
+PG_TSVECTOR = "to_tsvector('spanish', coalesce(titulo, '') || ' ' || coalesce(descripcion, ''))"
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tareas_fts USING fts5(titulo, descripcion, content='tareas', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    """CREATE TRIGGER IF NOT EXISTS tareas_fts_ai AFTER INSERT ON tareas BEGIN
+        INSERT INTO tareas_fts(rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tareas_fts_ad AFTER DELETE ON tareas BEGIN
+        INSERT INTO tareas_fts(tareas_fts, rowid, titulo, descripcion) VALUES ('delete', old.id, old.titulo, old.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tareas_fts_au AFTER UPDATE OF titulo, descripcion ON tareas BEGIN
+        INSERT INTO tareas_fts(tareas_fts, rowid, titulo, descripcion) VALUES ('delete', old.id, old.titulo, old.descripcion);
+        INSERT INTO tareas_fts(rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion);
+    END""",
+]
+
+PG_DDL = [f"CREATE INDEX IF NOT EXISTS ix_tareas_busqueda ON tareas USING GIN (({PG_TSVECTOR}))"]
+
+# El B-tree sobre descripcion no sirve para buscar subcadenas y encarece cada escritura
+DROP_INDICES_OBSOLETOS = ["DROP INDEX IF EXISTS ix_tareas_descripcion"]
+
+def crear_indice_busqueda(engine: Engine):
+    """Crea (si faltan) el índice de texto y sus triggers. Idempotente; se llama al arrancar."""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        for sql in DROP_INDICES_OBSOLETOS: conn.execute(text(sql))
+        if dialect == "sqlite":
+            existia = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'tareas_fts'")).first() is not None
+            for sql in SQLITE_DDL: conn.execute(text(sql))
+            # Primera vez sobre una BD con datos: indexar las tareas que ya existen
+            if not existia: conn.execute(text("INSERT INTO tareas_fts(tareas_fts) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            for sql in PG_DDL: conn.execute(text(sql))
+
+def _consulta_fts5(q: str) -> str:
+    # Cada palabra como literal entre comillas con prefijo (*): sin errores de sintaxis FTS5 y AND implícito
+    return " ".join('"' + palabra.replace('"', '""') + '"*' for palabra in q.split())
+
+def _escapar_like(q: str) -> str:
+    # % y _ son comodines de LIKE: se buscan como texto literal, igual que en FTS
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def select_busqueda(dialect: str, q: str, visible):
+    """SELECT de tareas que coinciden con q y cumplen `visible`, ordenadas por relevancia."""
+    if dialect == "sqlite":
+        fts = table("tareas_fts", column("rowid"))
+        rank = func.bm25(literal_column("tareas_fts"))
+        return select(models.Tarea).join(fts, fts.c.rowid == models.Tarea.id) \
+            .where(literal_column("tareas_fts").op("MATCH")(_consulta_fts5(q)), visible) \
+            .order_by(rank, models.Tarea.id)
+    if dialect == "postgresql":
+        vector = literal_column(PG_TSVECTOR)
+        consulta = func.websearch_to_tsquery(literal_column("'spanish'"), q)
+        return select(models.Tarea).where(vector.op("@@")(consulta), visible) \
+            .order_by(func.ts_rank(vector, consulta).desc(), models.Tarea.id)
+    patron = f"%{_escapar_like(q)}%"
+    return select(models.Tarea).where(models.Tarea.titulo.ilike(patron, escape="\\") | models.Tarea.descripcion.ilike(patron, escape="\\"), visible) \
+        .order_by(models.Tarea.id)
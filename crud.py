@@ -1,63 +1,346 @@
 # crud.py
+from sqlalchemy import Integer, and_, delete, exists, insert, literal, or_, select, tuple_, union, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-import models, schemas
-from auth import get_password_hash
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import models, schemas, busqueda
+from hashing import get_password_hash
 
 # --- CRUD Usuarios ---
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None: hashed_password = get_password_hash(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+def update_user_password_hash(db: Session, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+    return user
+
+# --- Versiones de cambios (ETag) ---
+# Cada escritura sube la versión de todos los usuarios que ven la tarea (creador y asignados),
+# en la misma transacción. GET /tareas deriva su ETag de esa versión.
+# Orden de bloqueos: siempre después de escribir tareas/asignaciones y con los user_id ordenados,
+# para que dos transacciones concurrentes no se bloqueen mutuamente (deadlock en PostgreSQL).
+def insert_con_conflictos(dialect: str, tabla):
+    """INSERT con soporte ON CONFLICT (PostgreSQL / SQLite), o None en otros dialectos."""
+    if dialect == "postgresql": return postgresql.insert(tabla)
+    if dialect == "sqlite": return sqlite.insert(tabla)
+    return None
+
+def stmts_bump_versiones(dialect: str, user_ids: Iterable[int]) -> list:
+    """Sentencias que suben la versión de user_ids (creándola a 1 si no existe), a ejecutar en orden."""
+    user_ids = sorted(set(user_ids))
+    version = models.VersionUsuario.version
+    stmt = insert_con_conflictos(dialect, models.VersionUsuario)
+    if stmt is not None:
+        return [stmt.values([{"user_id": user_id, "version": 1} for user_id in user_ids])
+                .on_conflict_do_update(index_elements=[models.VersionUsuario.user_id], set_={"version": version + 1})]
+    # Sin ON CONFLICT: UPDATE de las que existen e INSERT ... SELECT de las que faltan
+    # (dos primeras escrituras simultáneas de un usuario pueden chocar en la clave primaria)
+    falta = ~exists().where(models.VersionUsuario.user_id == models.User.id)
+    return [update(models.VersionUsuario).where(models.VersionUsuario.user_id.in_(user_ids)).values(version=version + 1),
+            insert(models.VersionUsuario).from_select(["user_id", "version"],
+                                                      select(models.User.id, literal(1)).where(models.User.id.in_(user_ids), falta))]
+
+def select_usuarios_relacionados(tarea_ids: Iterable[int]):
+    tarea_ids = set(tarea_ids)
+    return union(select(models.Tarea.creator_id).where(models.Tarea.id.in_(tarea_ids)),
+                 select(models.task_assignments.c.user_id).where(models.task_assignments.c.task_id.in_(tarea_ids)))
+
+def usuarios_relacionados(db: Session, tarea_ids: Iterable[int]) -> Set[int]:
+    return set(db.execute(select_usuarios_relacionados(tarea_ids)).scalars())
+
+def bump_versiones(db: Session, user_ids: Iterable[int]):
+    user_ids = {u for u in user_ids if u is not None}
+    if not user_ids: return
+    for stmt in stmts_bump_versiones(db.get_bind().dialect.name, user_ids): db.execute(stmt)
+
+def get_version_usuario(db: Session, user_id: int) -> int:
+    return db.execute(select(models.VersionUsuario.version).where(models.VersionUsuario.user_id == user_id)).scalar() or 0
+
 # --- CRUD Tareas ---
-def get_tareas_for_user(db: Session, user_id: int):
-    created = db.query(models.Tarea).filter(models.Tarea.creator_id == user_id).all()
-    assigned = db.query(models.Tarea).join(models.task_assignments).filter(models.task_assignments.c.user_id == user_id).all()
-    all_tasks = list(set(created + assigned))
-    return sorted(all_tasks, key=lambda x: x.id)
+COLUMNAS_TAREA = (models.Tarea.id, models.Tarea.titulo, models.Tarea.descripcion, models.Tarea.completada, models.Tarea.creator_id)
+
+def visible_para(user_id: int, alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas):
+    """Condición WHERE: tareas creadas por el usuario y/o asignadas a él (EXISTS, sin duplicados)."""
+    creada = models.Tarea.creator_id == user_id
+    asignada = exists().where(and_(models.task_assignments.c.task_id == models.Tarea.id,
+                                   models.task_assignments.c.user_id == user_id))
+    if alcance == schemas.AlcanceTareas.creadas: return creada
+    if alcance == schemas.AlcanceTareas.asignadas: return asignada
+    return or_(creada, asignada)
+
+def select_tareas_for_user(user_id: int, completada: Optional[bool] = None,
+                           alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas,
+                           despues_de: Optional[int] = None, limite: int = 100):
+    # Una sola consulta, con una rama por índice: las creadas recorren ix_tareas_creator_id_id y las
+    # asignadas la clave primaria (user_id, task_id) de task_assignments, cada una desde el cursor y con
+    # su propio LIMIT. Así el coste depende de las tareas del usuario, no del tamaño de la tabla.
+    # El UNION quita duplicados (el creador también figura como asignado) y se ordena y limita otra vez.
+    # Solo columnas (sin objetos ORM): los asignados se cargan en bloque con stmt_asignados_de_tareas.
+    # Se comparte con crud_async, por eso devuelve el SELECT en lugar de ejecutarlo.
+    ta = models.task_assignments
+    ramas = []
+    if alcance != schemas.AlcanceTareas.asignadas:
+        creadas = select(models.Tarea.id.label("id")).where(models.Tarea.creator_id == user_id)
+        if completada is not None: creadas = creadas.where(models.Tarea.completada == completada)
+        # Paginación por cursor (keyset): la siguiente página empieza después del último id recibido
+        if despues_de is not None: creadas = creadas.where(models.Tarea.id > despues_de)
+        ramas.append(creadas.order_by(models.Tarea.id).limit(limite).subquery())
+    if alcance != schemas.AlcanceTareas.creadas:
+        asignadas = select(ta.c.task_id.label("id")).where(ta.c.user_id == user_id)
+        if completada is not None:
+            asignadas = asignadas.join(models.Tarea, models.Tarea.id == ta.c.task_id).where(models.Tarea.completada == completada)
+        if despues_de is not None: asignadas = asignadas.where(ta.c.task_id > despues_de)
+        ramas.append(asignadas.order_by(ta.c.task_id).limit(limite).subquery())
+    ids = union(*(select(r.c.id) for r in ramas)) if len(ramas) > 1 else select(ramas[0].c.id)
+    return select(*COLUMNAS_TAREA).where(models.Tarea.id.in_(ids)).order_by(models.Tarea.id).limit(limite)
+
+def get_tareas_for_user(db: Session, user_id: int, completada: Optional[bool] = None,
+                        alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas,
+                        despues_de: Optional[int] = None, limite: int = 100):
+    return con_asignados(db, db.execute(select_tareas_for_user(user_id, completada, alcance, despues_de, limite)).all())
+
+def select_buscar_tareas(dialect: str, user_id: int, q: str, pagina: int = 1, limite: int = 20):
+    stmt = busqueda.select_busqueda(dialect, q, visible_para(user_id))
+    return stmt.with_only_columns(*COLUMNAS_TAREA).offset((pagina - 1) * limite).limit(limite)
+
+def buscar_tareas(db: Session, user_id: int, q: str, pagina: int = 1, limite: int = 20):
+    if not q.split(): return []  # solo espacios: no hay términos con los que construir la búsqueda
+    return con_asignados(db, db.execute(select_buscar_tareas(db.get_bind().dialect.name, user_id, q, pagina, limite)).all())
+
+# Lecturas como dicts con la forma de schemas.Tarea, construidos directamente desde las filas:
+# las rutas los codifican sin volver a validarlos (ver serializacion.py).
+def stmt_asignados_de_tareas(tarea_ids: Iterable[int]):
+    return select(models.task_assignments.c.task_id, models.User.id, models.User.email) \
+        .join(models.User, models.User.id == models.task_assignments.c.user_id) \
+        .where(models.task_assignments.c.task_id.in_(tarea_ids)).order_by(models.task_assignments.c.task_id, models.User.id)
+
+def agrupar_asignados(filas, asignados) -> List[dict]:
+    """filas: (id, titulo, descripcion, completada, creator_id); asignados: (task_id, id, email)."""
+    por_tarea = {}
+    for tarea_id, id_usuario, email in asignados:
+        por_tarea.setdefault(tarea_id, []).append({"id": id_usuario, "email": email})
+    return [{"id": f[0], "titulo": f[1], "descripcion": f[2], "completada": f[3], "creator_id": f[4],
+             "assignees": por_tarea.get(f[0], [])} for f in filas]
+
+def con_asignados(db: Session, filas) -> List[dict]:
+    if not filas: return []
+    return agrupar_asignados(filas, db.execute(stmt_asignados_de_tareas([f[0] for f in filas])).all())
+
+# Escrituras de una tarea: la autorización va en el WHERE de la propia sentencia (EXISTS sobre
+# creador/asignación) y los datos vuelven con RETURNING, sin cargar el objeto ORM ni hacer refresh.
+# Si la sentencia no afecta a ninguna fila, la ruta averigua el motivo (404/403...) con una consulta
+# aparte; ese camino solo se recorre en los errores. Las sentencias se comparten con crud_async.
+
+def es_creador(tarea_id: int, user_id: int):
+    return exists().where(and_(models.Tarea.id == tarea_id, models.Tarea.creator_id == user_id))
+
+def stmt_asignados(tarea_id: int):
+    return select(models.User.id, models.User.email).join(models.task_assignments, models.task_assignments.c.user_id == models.User.id) \
+        .where(models.task_assignments.c.task_id == tarea_id).order_by(models.User.id)
+
+def stmt_update_tarea(tarea_id: int, user_id: int, cambios: dict):
+    """UPDATE ... RETURNING solo si el usuario es el creador o un asignado (mismas reglas que PUT)."""
+    return update(models.Tarea).where(models.Tarea.id == tarea_id, visible_para(user_id)).values(**cambios).returning(*COLUMNAS_TAREA)
+
+def stmts_delete_tarea(tarea_id: int, user_id: int):
+    """(DELETE de asignaciones RETURNING user_id, DELETE de la tarea RETURNING id), ambos solo si es el creador."""
+    return (delete(models.task_assignments).where(models.task_assignments.c.task_id == tarea_id, es_creador(tarea_id, user_id))
+            .returning(models.task_assignments.c.user_id),
+            delete(models.Tarea).where(models.Tarea.id == tarea_id, models.Tarea.creator_id == user_id).returning(models.Tarea.id))
+
+def stmt_asignar_por_email(dialect: str, tarea_id: int, user_id: int, email: str):
+    """INSERT ... SELECT del usuario por email, solo si user_id es el creador; no hace nada si ya estaba asignado."""
+    origen = select(literal(tarea_id, Integer), models.User.id).where(models.User.email == email, es_creador(tarea_id, user_id))
+    stmt = insert_con_conflictos(dialect, models.task_assignments)
+    if stmt is None:
+        ya_asignado = exists().where(and_(models.task_assignments.c.task_id == tarea_id, models.task_assignments.c.user_id == models.User.id))
+        return insert(models.task_assignments).from_select(["task_id", "user_id"], origen.where(~ya_asignado)) \
+            .returning(models.task_assignments.c.user_id)
+    return stmt.from_select(["task_id", "user_id"], origen).on_conflict_do_nothing().returning(models.task_assignments.c.user_id)
+
+def stmt_quitar_por_email(tarea_id: int, user_id: int, email: str):
+    """DELETE de la asignación, solo si user_id es el creador y el quitado no es él mismo."""
+    id_por_email = select(models.User.id).where(models.User.email == email).scalar_subquery()
+    return delete(models.task_assignments).where(models.task_assignments.c.task_id == tarea_id, models.task_assignments.c.user_id == id_por_email,
+                                                 models.task_assignments.c.user_id != user_id, es_creador(tarea_id, user_id)) \
+        .returning(models.task_assignments.c.user_id)
+
+def stmt_diagnostico_asignacion(tarea_id: int, email: str):
+    """(creator_id de la tarea, id del usuario con ese email); None donde no existan."""
+    return select(select(models.Tarea.creator_id).where(models.Tarea.id == tarea_id).scalar_subquery(),
+                  select(models.User.id).where(models.User.email == email).scalar_subquery())
+
+def tarea_dict(fila, asignados) -> dict:
+    return {**fila._asdict(), "assignees": [{"id": a.id, "email": a.email} for a in asignados]}
 
-def create_tarea(db: Session, tarea: schemas.TareaCreacion, user_id: int):
-    creator = db.query(models.User).filter(models.User.id == user_id).first()
-    db_tarea = models.Tarea(**tarea.dict(), creator_id=user_id)
-    db_tarea.assignees.append(creator)
-    db.add(db_tarea)
+def create_tarea(db: Session, tarea: schemas.TareaCreacion, user_id: int, user_email: str) -> dict:
+    [tarea_id] = _insertar_tareas(db, [tarea.dict()], user_id)
+    bump_versiones(db, [user_id])
     db.commit()
-    db.refresh(db_tarea)
-    return db_tarea
+    return {**tarea.dict(), "id": tarea_id, "creator_id": user_id, "assignees": [{"id": user_id, "email": user_email}]}
 
-def get_tarea_by_id(db: Session, tarea_id: int):
-    return db.query(models.Tarea).filter(models.Tarea.id == tarea_id).first()
+def get_permiso_tarea(db: Session, tarea_id: int, user_id: int) -> Optional[Tuple[bool, bool]]:
+    """(es_creador, es_asignado), o None si la tarea no existe."""
+    return get_permisos_tareas(db, [tarea_id], user_id).get(tarea_id)
 
-def update_tarea(db: Session, tarea: models.Tarea, tarea_data: schemas.TareaCreacion):
-    tarea.titulo = tarea_data.titulo
-    tarea.descripcion = tarea_data.descripcion
-    tarea.completada = tarea_data.completada
+def get_tarea_dict(db: Session, tarea_id: int) -> Optional[dict]:
+    fila = db.execute(select(*COLUMNAS_TAREA).where(models.Tarea.id == tarea_id)).first()
+    return tarea_dict(fila, db.execute(stmt_asignados(tarea_id)).all()) if fila else None
+
+def update_tarea(db: Session, tarea_id: int, user_id: int, cambios: dict) -> Optional[dict]:
+    """Aplica `cambios` (campos de TareaBase) si el usuario puede editar la tarea; None si no existe o no puede."""
+    fila = db.execute(stmt_update_tarea(tarea_id, user_id, cambios)).first()
+    if fila is None:
+        db.rollback()
+        return None
+    asignados = db.execute(stmt_asignados(tarea_id)).all()
+    bump_versiones(db, [fila.creator_id, *(a.id for a in asignados)])
     db.commit()
-    db.refresh(tarea)
-    return tarea
+    return tarea_dict(fila, asignados)
 
-def delete_tarea(db: Session, tarea: models.Tarea):
-    db.delete(tarea)
+def delete_tarea(db: Session, tarea_id: int, user_id: int) -> Optional[Set[int]]:
+    """Borra la tarea si el usuario es su creador. Devuelve los usuarios que la veían, o None si no se borró."""
+    borrar_asignaciones, borrar_tarea = stmts_delete_tarea(tarea_id, user_id)
+    asignados = db.execute(borrar_asignaciones).scalars().all()
+    if db.execute(borrar_tarea).first() is None:
+        db.rollback()
+        return None
+    afectados = {user_id, *asignados}
+    bump_versiones(db, afectados)
     db.commit()
-    return
+    return afectados
 
 # --- Lógica de Asignaciones ---
-def assign_user_to_task(db: Session, tarea: models.Tarea, user_to_assign: models.User):
-    if user_to_assign not in tarea.assignees:
-        tarea.assignees.append(user_to_assign)
-        db.commit()
-        db.refresh(tarea)
-    return tarea
-
-def remove_user_from_task(db: Session, tarea: models.Tarea, user_to_remove: models.User):
-    if user_to_remove in tarea.assignees and tarea.creator_id != user_to_remove.id:
-        tarea.assignees.remove(user_to_remove)
-        db.commit()
-        db.refresh(tarea)
-    return tarea
\ No newline at end of file
+def assign_user_to_task(db: Session, tarea_id: int, user_id: int, email: str) -> Optional[dict]:
+    """Asigna por email si user_id es el creador. None si no se insertó nada (sin permiso, no existe o ya asignado)."""
+    if db.execute(stmt_asignar_por_email(db.get_bind().dialect.name, tarea_id, user_id, email)).first() is None:
+        db.rollback()
+        return None
+    return _tarea_tras_asignacion(db, tarea_id)
+
+def remove_user_from_task(db: Session, tarea_id: int, user_id: int, email: str) -> Optional[Tuple[dict, int]]:
+    """Quita la asignación por email si user_id es el creador. (tarea, id del quitado), o None si no se borró nada."""
+    quitado = db.execute(stmt_quitar_por_email(tarea_id, user_id, email)).scalar()
+    if quitado is None:
+        db.rollback()
+        return None
+    return _tarea_tras_asignacion(db, tarea_id, quitado), quitado
+
+def _tarea_tras_asignacion(db: Session, tarea_id: int, *otros_afectados: int) -> dict:
+    fila = db.execute(select(*COLUMNAS_TAREA).where(models.Tarea.id == tarea_id)).first()
+    asignados = db.execute(stmt_asignados(tarea_id)).all()
+    bump_versiones(db, [fila.creator_id, *(a.id for a in asignados), *otros_afectados])
+    db.commit()
+    return tarea_dict(fila, asignados)
+
+def diagnosticar_asignacion(db: Session, tarea_id: int, email: str) -> Tuple[Optional[int], Optional[int]]:
+    return tuple(db.execute(stmt_diagnostico_asignacion(tarea_id, email)).one())
+
+# --- Operaciones en Lote ---
+# Cada función de escritura hace un único commit: el lote entero es una transacción.
+def stmt_permisos_tareas(tarea_ids: Iterable[int], user_id: int):
+    asignado = exists().where(and_(models.task_assignments.c.task_id == models.Tarea.id,
+                                   models.task_assignments.c.user_id == user_id))
+    return select(models.Tarea.id, (models.Tarea.creator_id == user_id).label("es_creador"), asignado.label("es_asignado")) \
+        .where(models.Tarea.id.in_(set(tarea_ids)))
+
+def get_permisos_tareas(db: Session, tarea_ids: Iterable[int], user_id: int) -> Dict[int, Tuple[bool, bool]]:
+    """{tarea_id: (es_creador, es_asignado)} para las tareas que existen, en una sola consulta."""
+    return {row.id: (bool(row.es_creador), bool(row.es_asignado)) for row in db.execute(stmt_permisos_tareas(tarea_ids, user_id))}
+
+def destinatarios_por_tarea(db: Session, tarea_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """{tarea_id: {creador y asignados}}: a quién notificar los cambios de cada tarea (eventos.py)."""
+    tarea_ids = set(tarea_ids)
+    stmt = union_all(select(models.Tarea.id, models.Tarea.creator_id).where(models.Tarea.id.in_(tarea_ids)),
+                     select(models.task_assignments.c.task_id, models.task_assignments.c.user_id)
+                     .where(models.task_assignments.c.task_id.in_(tarea_ids)))
+    destinatarios = {}
+    for tarea_id, user_id in db.execute(stmt): destinatarios.setdefault(tarea_id, set()).add(user_id)
+    return destinatarios
+
+def get_creadores_tareas(db: Session, tarea_ids: Iterable[int]) -> Dict[int, int]:
+    stmt = select(models.Tarea.id, models.Tarea.creator_id).where(models.Tarea.id.in_(set(tarea_ids)))
+    return {row.id: row.creator_id for row in db.execute(stmt)}
+
+def get_user_ids_by_emails(db: Session, emails: Iterable[str]) -> Dict[str, int]:
+    stmt = select(models.User.email, models.User.id).where(models.User.email.in_(set(emails)))
+    return {row.email: row.id for row in db.execute(stmt)}
+
+def _insertar_tareas(db: Session, filas: List[dict], user_id: int) -> List[int]:
+    # INSERT multi-fila; sort_by_parameter_order garantiza que los ids vuelven en el orden del lote
+    stmt = insert(models.Tarea).returning(models.Tarea.id, sort_by_parameter_order=True)
+    ids = db.execute(stmt, [{**f, "creator_id": user_id} for f in filas]).scalars().all()
+    db.execute(insert(models.task_assignments), [{"user_id": user_id, "task_id": tarea_id} for tarea_id in ids])
+    return ids
+
+def create_tareas_bulk(db: Session, tareas: List[schemas.TareaCreacion], user_id: int) -> List[int]:
+    if not tareas: return []
+    ids = _insertar_tareas(db, [t.dict() for t in tareas], user_id)
+    bump_versiones(db, [user_id])
+    db.commit()
+    return ids
+
+def update_tareas_bulk(db: Session, cambios: List[dict]):
+    """cambios: [{"id": ..., <campos a modificar>}]; UPDATE por clave primaria agrupado por columnas."""
+    cambios = [c for c in cambios if len(c) > 1]
+    if cambios:
+        db.execute(update(models.Tarea), cambios)
+        bump_versiones(db, usuarios_relacionados(db, [c["id"] for c in cambios]))
+    db.commit()
+
+def delete_tareas_bulk(db: Session, tarea_ids: List[int]):
+    if tarea_ids:
+        afectados = usuarios_relacionados(db, tarea_ids)  # antes de borrar, que después ya no se pueden leer
+        db.execute(delete(models.task_assignments).where(models.task_assignments.c.task_id.in_(tarea_ids)))
+        db.execute(delete(models.Tarea).where(models.Tarea.id.in_(tarea_ids)))
+        bump_versiones(db, afectados)
+    db.commit()
+
+def add_assignments_bulk(db: Session, pares: Set[Tuple[int, int]]):
+    """pares: {(task_id, user_id)}; solo se insertan los que aún no existen."""
+    if pares:
+        existentes = db.execute(select(models.task_assignments.c.task_id, models.task_assignments.c.user_id)
+                                .where(tuple_(models.task_assignments.c.task_id, models.task_assignments.c.user_id).in_(pares)))
+        nuevos = pares - {tuple(row) for row in existentes}
+        if nuevos:
+            db.execute(insert(models.task_assignments), [{"task_id": t, "user_id": u} for t, u in nuevos])
+            bump_versiones(db, usuarios_relacionados(db, {t for t, _ in nuevos}))
+    db.commit()
+
+def remove_assignments_bulk(db: Session, pares: Set[Tuple[int, int]]):
+    if pares:
+        afectados = usuarios_relacionados(db, {t for t, _ in pares})  # incluye a los que se van a quitar
+        db.execute(delete(models.task_assignments)
+                   .where(tuple_(models.task_assignments.c.task_id, models.task_assignments.c.user_id).in_(pares)))
+        bump_versiones(db, afectados)
+    db.commit()
+
+# --- Exportación / Importación (NDJSON) ---
+def iter_tareas_exportacion(db: Session, user_id: int, completada: Optional[bool] = None,
+                            alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas,
+                            tamano_bloque: int = schemas.BLOQUE_EXPORTACION) -> Iterator[List[dict]]:
+    """Bloques de tareas visibles (dicts con sus asignados) leídos con un cursor del servidor:
+    la memoria no depende del número total de tareas. Los asignados se cargan con una consulta por bloque."""
+    stmt = select(*COLUMNAS_TAREA).where(visible_para(user_id, alcance)).order_by(models.Tarea.id).execution_options(yield_per=tamano_bloque)
+    if completada is not None: stmt = stmt.where(models.Tarea.completada == completada)
+    for filas in db.execute(stmt).partitions():
+        yield con_asignados(db, filas)
+
+def importar_tareas(db: Session, tareas: List[schemas.TareaImportacion], asignados: List[Set[int]], user_id: int) -> List[int]:
+    """Crea las tareas (del usuario) con sus asignados en una sola transacción. asignados[i]: user_ids de tareas[i]."""
+    if not tareas: return []
+    ids = _insertar_tareas(db, [t.dict(exclude={"assignees"}) for t in tareas], user_id)
+    pares = [{"task_id": tarea_id, "user_id": u} for tarea_id, usuarios in zip(ids, asignados) for u in usuarios if u != user_id]
+    if pares: db.execute(insert(models.task_assignments), pares)
+    bump_versiones(db, {user_id, *(p["user_id"] for p in pares)})
+    db.commit()
+    return ids
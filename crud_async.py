@@ -0,0 +1,106 @@
+# crud_async.py
+# Versiones async de crud.py para el modo DATABASE_ASYNC. Misma API, pero con AsyncSession:
+# las sentencias se construyen en crud.py y las tareas se devuelven como dicts (sin objetos ORM).
+from __future__ import annotations
+from sqlalchemy import insert, select
+from typing import TYPE_CHECKING, Optional, Set, Tuple
+import models, schemas
+from crud import (COLUMNAS_TAREA, agrupar_asignados, select_tareas_for_user, stmt_asignados, stmt_asignados_de_tareas,
+                  stmt_asignar_por_email, stmts_bump_versiones, stmt_diagnostico_asignacion, stmt_permisos_tareas, stmt_quitar_por_email, stmt_update_tarea, stmts_delete_tarea, tarea_dict)
+from hashing import get_password_hash_async
+
+if TYPE_CHECKING:  # sqlalchemy.ext.asyncio requiere greenlet; solo se importa en modo async
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# --- CRUD Usuarios ---
+async def get_user_by_email(db: AsyncSession, email: str):
+    return (await db.execute(select(models.User).filter(models.User.email == email))).scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None: hashed_password = await get_password_hash_async(user.password)
+    db_user = models.User(email=user.email, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    return db_user
+
+async def update_user_password_hash(db: AsyncSession, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    await db.commit()
+    return user
+
+# --- Versiones de cambios (ETag) ---
+async def bump_versiones(db: AsyncSession, user_ids):
+    user_ids = {u for u in user_ids if u is not None}
+    if not user_ids: return
+    for stmt in stmts_bump_versiones(db.get_bind().dialect.name, user_ids): await db.execute(stmt)
+
+async def get_version_usuario(db: AsyncSession, user_id: int) -> int:
+    return (await db.execute(select(models.VersionUsuario.version).where(models.VersionUsuario.user_id == user_id))).scalar() or 0
+
+# --- CRUD Tareas ---
+async def get_tareas_for_user(db: AsyncSession, user_id: int, completada: Optional[bool] = None,
+                              alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas,
+                              despues_de: Optional[int] = None, limite: int = 100):
+    filas = (await db.execute(select_tareas_for_user(user_id, completada, alcance, despues_de, limite))).all()
+    if not filas: return []
+    return agrupar_asignados(filas, (await db.execute(stmt_asignados_de_tareas([f[0] for f in filas]))).all())
+
+async def create_tarea(db: AsyncSession, tarea: schemas.TareaCreacion, user_id: int, user_email: str) -> dict:
+    tarea_id = (await db.execute(insert(models.Tarea).values(**tarea.dict(), creator_id=user_id).returning(models.Tarea.id))).scalar_one()
+    await db.execute(insert(models.task_assignments).values(task_id=tarea_id, user_id=user_id))
+    await bump_versiones(db, [user_id])
+    await db.commit()
+    return {**tarea.dict(), "id": tarea_id, "creator_id": user_id, "assignees": [{"id": user_id, "email": user_email}]}
+
+async def get_permiso_tarea(db: AsyncSession, tarea_id: int, user_id: int) -> Optional[Tuple[bool, bool]]:
+    row = (await db.execute(stmt_permisos_tareas([tarea_id], user_id))).first()
+    return (bool(row.es_creador), bool(row.es_asignado)) if row else None
+
+async def get_tarea_dict(db: AsyncSession, tarea_id: int) -> Optional[dict]:
+    fila = (await db.execute(select(*COLUMNAS_TAREA).where(models.Tarea.id == tarea_id))).first()
+    return tarea_dict(fila, (await db.execute(stmt_asignados(tarea_id))).all()) if fila else None
+
+async def update_tarea(db: AsyncSession, tarea_id: int, user_id: int, cambios: dict) -> Optional[dict]:
+    fila = (await db.execute(stmt_update_tarea(tarea_id, user_id, cambios))).first()
+    if fila is None:
+        await db.rollback()
+        return None
+    asignados = (await db.execute(stmt_asignados(tarea_id))).all()
+    await bump_versiones(db, [fila.creator_id, *(a.id for a in asignados)])
+    await db.commit()
+    return tarea_dict(fila, asignados)
+
+async def delete_tarea(db: AsyncSession, tarea_id: int, user_id: int) -> Optional[Set[int]]:
+    borrar_asignaciones, borrar_tarea = stmts_delete_tarea(tarea_id, user_id)
+    asignados = (await db.execute(borrar_asignaciones)).scalars().all()
+    if (await db.execute(borrar_tarea)).first() is None:
+        await db.rollback()
+        return None
+    afectados = {user_id, *asignados}
+    await bump_versiones(db, afectados)
+    await db.commit()
+    return afectados
+
+# --- Lógica de Asignaciones ---
+async def assign_user_to_task(db: AsyncSession, tarea_id: int, user_id: int, email: str) -> Optional[dict]:
+    if (await db.execute(stmt_asignar_por_email(db.get_bind().dialect.name, tarea_id, user_id, email))).first() is None:
+        await db.rollback()
+        return None
+    return await _tarea_tras_asignacion(db, tarea_id)
+
+async def remove_user_from_task(db: AsyncSession, tarea_id: int, user_id: int, email: str) -> Optional[Tuple[dict, int]]:
+    quitado = (await db.execute(stmt_quitar_por_email(tarea_id, user_id, email))).scalar()
+    if quitado is None:
+        await db.rollback()
+        return None
+    return await _tarea_tras_asignacion(db, tarea_id, quitado), quitado
+
+async def _tarea_tras_asignacion(db: AsyncSession, tarea_id: int, *otros_afectados: int) -> dict:
+    fila = (await db.execute(select(*COLUMNAS_TAREA).where(models.Tarea.id == tarea_id))).first()
+    asignados = (await db.execute(stmt_asignados(tarea_id))).all()
+    await bump_versiones(db, [fila.creator_id, *(a.id for a in asignados), *otros_afectados])
+    await db.commit()
+    return tarea_dict(fila, asignados)
+
+async def diagnosticar_asignacion(db: AsyncSession, tarea_id: int, email: str) -> Tuple[Optional[int], Optional[int]]:
+    return tuple((await db.execute(stmt_diagnostico_asignacion(tarea_id, email))).one())
@@ -1,18 +1,182 @@
 # database.py
-import os
-from sqlalchemy import create_engine
+import os, time
+from threading import Lock
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sqlitedb.db")
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sqlitedb.db")
+# Réplica de lectura opcional: las rutas de solo lectura (GET /tareas) usan get_read_db
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# --- Modo asíncrono (opcional) ---
+# Se activa con un driver async en la URL (sqlite+aiosqlite://, postgresql+asyncpg://)
+# o con DATABASE_ASYNC=1. El motor síncrono se mantiene siempre para las rutas aún no portadas.
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def _urls(url: str):
+    url = make_url(url.replace("postgres://", "postgresql://", 1))
+    dialect = url.get_backend_name()
+    if url.get_driver_name() == ASYNC_DRIVERS.get(dialect):
+        return url.set(drivername=dialect), url, True
+    return url, url.set(drivername=f"{dialect}+{ASYNC_DRIVERS[dialect]}") if dialect in ASYNC_DRIVERS else None, False
+
+_sync_url, _async_url, _async_scheme = _urls(DATABASE_URL)
+ASYNC_MODE = _async_scheme or os.getenv("DATABASE_ASYNC", "0") == "1"
+SQLALCHEMY_DATABASE_URL = _sync_url.render_as_string(hide_password=False)
+
+# --- Configuración del pool por dialecto (sobrescribible por variables de entorno) ---
+# pool_size + max_overflow >= hilos del threadpool (40): si no, las rutas síncronas pueden
+# quedarse esperando una conexión que solo se libera cuando otro hilo cierra su sesión.
+POOL_DEFAULTS = {
+    "postgresql": {"pool_size": 10, "max_overflow": 30, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True},
+    "sqlite": {"pool_size": 10, "max_overflow": 30, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": False},
+}
+_POOL_ENV = {"pool_size": ("DB_POOL_SIZE", int), "max_overflow": ("DB_MAX_OVERFLOW", int),
+             "pool_timeout": ("DB_POOL_TIMEOUT", float), "pool_recycle": ("DB_POOL_RECYCLE", int),
+             "pool_pre_ping": ("DB_POOL_PRE_PING", lambda v: v.lower() in ("1", "true", "yes"))}
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# PRAGMAs de SQLite aplicados a cada conexión nueva
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),   # lectores y un escritor concurrentes
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),  # seguro con WAL y con muchos menos fsync
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),  # esperar al escritor en vez de "database is locked"
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-20000"),    # negativo = KiB (~20 MB)
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),
+}
+
+# --- Métricas del pool ---
+class PoolMetrics:
+    """Espera en el checkout de conexiones y saturación de un pool."""
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.capacity = 0
+        self.checkouts = self.timeouts = 0
+        self.wait_seconds_total = self.wait_seconds_max = 0.0
+        self._lock = Lock()
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out: self.timeouts += 1
+            else: self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            data = {"checkouts": self.checkouts, "timeouts": self.timeouts,
+                    "wait_seconds_total": round(self.wait_seconds_total, 6), "wait_seconds_max": round(self.wait_seconds_max, 6)}
+        if pool is not None:
+            data.update({"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow(), "capacity": self.capacity,
+                         "saturation": round(pool.checkedout() / self.capacity, 4) if self.capacity else 0.0})
+        return data
+
+POOL_METRICS = {}
+
+def _metered_pool(base, metrics: PoolMetrics):
+    # Subclase por motor: recreate() (engine.dispose) reutiliza la clase y con ella las métricas
+    class MeteredPool(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            metrics.pool = self
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                conn = super()._do_get()
+            except PoolTimeoutError:
+                metrics.record(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.record(time.perf_counter() - start)
+            return conn
+    return MeteredPool
+
+def _engine_kwargs(url, name: str, is_async: bool = False) -> dict:
+    dialect = url.get_backend_name()
+    kwargs, connect_args = {}, {}
+    if dialect == "sqlite":
+        connect_args["check_same_thread"] = False
+        if url.database in (None, "", ":memory:"): return {"connect_args": connect_args}
+    if dialect in POOL_DEFAULTS:
+        kwargs.update(POOL_DEFAULTS[dialect])
+        for key, (env, cast) in _POOL_ENV.items():
+            if os.getenv(env) is not None: kwargs[key] = cast(os.getenv(env))
+        metrics = POOL_METRICS[name] = PoolMetrics(name)
+        metrics.capacity = kwargs["pool_size"] + max(kwargs["max_overflow"], 0)
+        kwargs["poolclass"] = _metered_pool(AsyncAdaptedQueuePool if is_async else QueuePool, metrics)
+    if dialect == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async: connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else: connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    kwargs["connect_args"] = connect_args
+    return kwargs
+
+def _apply_sqlite_pragmas(sync_engine):
+    if sync_engine.dialect.name != "sqlite": return
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+def _create_engine(url, name: str):
+    engine = create_engine(url, **_engine_kwargs(url, name))
+    _apply_sqlite_pragmas(engine)
+    return engine
+
+engine = _create_engine(_sync_url, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Sin réplica configurada, las lecturas van al motor principal
+read_engine = _create_engine(_urls(DATABASE_READ_URL)[0], "read") if DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if DATABASE_READ_URL else SessionLocal
+
+async_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if ASYNC_MODE:
+    if _async_url is None: raise RuntimeError(f"No hay driver async configurado para {_sync_url.get_backend_name()}")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    async_engine = create_async_engine(_async_url, **_engine_kwargs(_async_url, "async", is_async=True))
+    _apply_sqlite_pragmas(async_engine.sync_engine)
+    # expire_on_commit=False: tras el commit los objetos siguen usables sin cargas perezosas (no permitidas en async)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = AsyncSessionLocal
+    if DATABASE_READ_URL:
+        _async_read_url = _urls(DATABASE_READ_URL)[1]
+        async_read_engine = create_async_engine(_async_read_url, **_engine_kwargs(_async_read_url, "async_read", is_async=True))
+        _apply_sqlite_pragmas(async_read_engine.sync_engine)
+        AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+def pool_stats() -> dict:
+    return {name: metrics.stats() for name, metrics in POOL_METRICS.items()}
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Sesión para rutas de solo lectura: réplica si DATABASE_READ_URL está definida (puede ir algo retrasada)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
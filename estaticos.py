@@ -0,0 +1,86 @@
+# estaticos.py
+# Ficheros estáticos con caché de larga duración y variantes precomprimidas (gzip / brotli).
+# Las URLs de index.html llevan ?v=<huella del contenido>, así que pueden cachearse un año:
+# al cambiar el fichero cambia la URL.
+import gzip, hashlib, mimetypes, os, re, stat
+import anyio
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, Response
+from starlette.datastructures import Headers
+import etags
+
+try:  # brotli es opcional: sin él solo se sirve gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRIMIBLES = {".js", ".css", ".html", ".svg", ".json", ".txt"}
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+def _compresores():
+    yield ".gz", "gzip", lambda datos: gzip.compress(datos, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield ".br", "br", lambda datos: brotli.compress(datos, quality=11)
+
+def precomprimir(directorio: str):
+    """Genera fichero.gz / fichero.br junto a cada fichero de texto si faltan o están desactualizados."""
+    for raiz, _, ficheros in os.walk(directorio):
+        for nombre in ficheros:
+            if os.path.splitext(nombre)[1] not in COMPRIMIBLES: continue
+            ruta = os.path.join(raiz, nombre)
+            with open(ruta, "rb") as f: datos = f.read()
+            for ext, _, comprimir in _compresores():
+                destino = ruta + ext
+                if os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(ruta): continue
+                try:
+                    with open(destino + ".tmp", "wb") as f: f.write(comprimir(datos))
+                    os.replace(destino + ".tmp", destino)
+                except OSError:
+                    pass  # disco de solo lectura: se sirve sin comprimir
+
+def huella(ruta: str) -> str:
+    with open(ruta, "rb") as f: return hashlib.sha256(f.read()).hexdigest()[:12]
+
+def _encodings_aceptados(scope) -> set:
+    aceptados = set()
+    for parte in Headers(scope=scope).get("accept-encoding", "").split(","):
+        nombre, _, params = parte.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"): aceptados.add(nombre.strip().lower())
+    return aceptados
+
+class StaticFilesCacheables(StaticFiles):
+    async def get_response(self, path: str, scope) -> Response:
+        response = None
+        if scope["method"] in ("GET", "HEAD"):
+            aceptados = _encodings_aceptados(scope)
+            for ext, encoding, _ in _compresores():
+                if encoding not in aceptados: continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + ext)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    response = self.file_response(full_path, stat_result, scope)
+                    if response.status_code == 200:
+                        response.headers["content-encoding"] = encoding
+                        response.headers["content-type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                    break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["vary"] = "Accept-Encoding"
+        versionada = b"v=" in scope.get("query_string", b"")
+        response.headers["cache-control"] = CACHE_INMUTABLE if versionada else CACHE_REVALIDAR
+        return response
+
+class IndexVersionado:
+    """index.html con las URLs de /static/ versionadas; se calcula una vez al arrancar."""
+    def __init__(self, directorio: str):
+        def versionar(m):
+            ruta = os.path.join(directorio, m.group(2))
+            return f'{m.group(1)}="/static/{m.group(2)}?v={huella(ruta)}"' if os.path.isfile(ruta) else m.group(0)
+        with open(os.path.join(directorio, "index.html"), encoding="utf-8") as f:
+            self.html = re.sub(r'(src|href)="/static/([^"?#]+)"', versionar, f.read())
+        self.etag = f'"{hashlib.sha256(self.html.encode()).hexdigest()[:16]}"'
+
+    def respuesta(self, if_none_match: str = None) -> Response:
+        cabeceras = {"ETag": self.etag, "Cache-Control": CACHE_REVALIDAR}
+        if etags.coincide(if_none_match, self.etag): return Response(status_code=304, headers=cabeceras)
+        return HTMLResponse(self.html, headers=cabeceras)
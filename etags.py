@@ -0,0 +1,26 @@
+# etags.py
+# ETags fuertes para las lecturas de tareas. Se derivan de la versión de cambios del usuario
+# (models.VersionUsuario), así que responder 304 solo cuesta leer esa fila.
+import hashlib
+from typing import Optional
+from fastapi import Response
+
+# El navegador guarda la respuesta pero siempre revalida con If-None-Match antes de usarla
+CACHE_CONTROL = "private, no-cache"
+
+def etag_tareas(user_id: int, version: int, *partes) -> str:
+    """ETag de una lectura: usuario + versión + huella de lo pedido (filtros, página, id...)."""
+    huella = hashlib.sha1(repr(partes).encode()).hexdigest()[:16]
+    return f'"u{user_id}-v{version}-{huella}"'
+
+def coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match: return False
+    candidatos = {e.strip() for e in if_none_match.split(",")}
+    return "*" in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+def no_modificado(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def marcar(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
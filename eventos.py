@@ -0,0 +1,181 @@
+# eventos.py
+# Canal de cambios en tiempo real. Cada mutación publica un evento compacto (delta) para todos los
+# usuarios relacionados con la tarea; los clientes lo reciben por WebSocket o SSE (ver main.py).
+#
+# - BrokerEnMemoria: reparte los eventos entre las conexiones de este proceso.
+# - BrokerRedis: para varios workers; publica en Redis y cada worker reparte a sus conexiones.
+#   Se activa con EVENT_BROKER_URL=redis://... (requiere `pip install 'redis>=5.0.1'`).
+# Otros brokers solo necesitan implementar publicar() (y, si escuchan un bus, iniciar()/detener()).
+# publicar() se llama después del commit: no puede bloquear el event loop ni hacer fallar la petición.
+import asyncio, contextlib, json, logging, os
+from threading import Lock
+from typing import Dict, Iterable, Optional, Set
+
+try:  # redis es opcional: solo hace falta con EVENT_BROKER_URL=redis://...
+    import redis.asyncio as redis_async
+except ImportError:
+    redis_async = None
+
+EVENTOS_COLA_MAX = int(os.getenv("EVENTOS_COLA_MAX", "100"))
+EVENT_BROKER_URL = os.getenv("EVENT_BROKER_URL", "")
+# Eventos pendientes de publicar en Redis; si se llena, se entregan solo a las conexiones locales
+EVENTOS_PUBLICACION_MAX = int(os.getenv("EVENTOS_PUBLICACION_MAX", "10000"))
+# Reintentos de la suscripción a Redis: espera inicial y máxima (se duplica en cada fallo)
+ESPERA_REDIS_MIN_S, ESPERA_REDIS_MAX_S = 0.5, 30.0
+# Comentario SSE periódico para que proxies y navegador no den la conexión por muerta
+SSE_HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", "15"))
+
+# Evento que sustituye a la cola de un consumidor lento: el cliente debe recargar la lista entera
+RESYNC = {"tipo": "resync"}
+
+log = logging.getLogger("tareas.eventos")
+
+class Suscripcion:
+    """Cola acotada de una conexión. Si el cliente no da abasto se descarta lo pendiente y se pide un resync."""
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, max_pendientes: int = EVENTOS_COLA_MAX):
+        self.user_id = user_id
+        self.loop = loop
+        self.cola = asyncio.Queue(maxsize=max_pendientes)
+        self.descartados = 0
+
+    def _entregar(self, evento: dict):
+        # Siempre en el hilo del event loop (vía call_soon_threadsafe)
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.descartados += self.cola.qsize()
+            while not self.cola.empty(): self.cola.get_nowait()
+            self.cola.put_nowait(RESYNC)
+
+    async def siguiente(self) -> dict:
+        return await self.cola.get()
+
+class BrokerEnMemoria:
+    def __init__(self):
+        self._suscripciones: Dict[int, Set[Suscripcion]] = {}
+        self._lock = Lock()
+
+    def suscribir(self, user_id: int) -> Suscripcion:
+        suscripcion = Suscripcion(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._suscripciones.setdefault(user_id, set()).add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            suscripciones = self._suscripciones.get(suscripcion.user_id)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones: del self._suscripciones[suscripcion.user_id]
+
+    def publicar(self, user_ids: Iterable[int], evento: dict):
+        """Seguro desde cualquier hilo (las rutas síncronas corren en el threadpool)."""
+        self._entregar_local(user_ids, evento)
+
+    def _entregar_local(self, user_ids: Iterable[int], evento: dict):
+        with self._lock:
+            destinos = [s for user_id in set(user_ids) for s in self._suscripciones.get(user_id, ())]
+        for suscripcion in destinos:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion._entregar, evento)
+            except RuntimeError:
+                pass  # event loop cerrado: la conexión ya no existe
+
+    def conexiones(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._suscripciones.values())
+
+    async def iniciar(self): pass
+    async def detener(self): pass
+
+class BrokerRedis(BrokerEnMemoria):
+    """publicar() solo encola (desde cualquier hilo) y una tarea del event loop publica con redis.asyncio.
+    Si Redis falla, el evento se entrega al menos a las conexiones de este proceso."""
+    CANAL = "tareas:eventos"
+
+    def __init__(self, url: str):
+        super().__init__()
+        if redis_async is None: raise RuntimeError("EVENT_BROKER_URL=redis://... requiere `pip install 'redis>=5.0.1'`")
+        self._url = url
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._salida: Optional[asyncio.Queue] = None
+        self._cliente = None
+        self._tareas = []
+
+    def publicar(self, user_ids: Iterable[int], evento: dict):
+        mensaje = {"user_ids": sorted(set(user_ids)), "evento": evento}
+        if self._loop is None:  # broker sin iniciar (fuera del ciclo de vida de la app)
+            self._entregar_local(mensaje["user_ids"], evento)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._encolar, mensaje)
+        except RuntimeError:  # event loop cerrado
+            self._entregar_local(mensaje["user_ids"], evento)
+
+    def _encolar(self, mensaje: dict):
+        try:
+            self._salida.put_nowait(mensaje)
+        except asyncio.QueueFull:
+            log.warning("Cola de publicación en Redis llena: evento entregado solo en este proceso")
+            self._entregar_local(mensaje["user_ids"], mensaje["evento"])
+
+    async def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        self._salida = asyncio.Queue(maxsize=EVENTOS_PUBLICACION_MAX)
+        self._cliente = redis_async.Redis.from_url(self._url)
+        self._tareas = [asyncio.create_task(self._escuchar()), asyncio.create_task(self._publicar_pendientes())]
+
+    async def _publicar_pendientes(self):
+        while True:
+            mensaje = await self._salida.get()
+            try:
+                await self._cliente.publish(self.CANAL, json.dumps(mensaje))
+            except Exception:  # Redis caído o lento: la tarea sigue viva para los siguientes eventos
+                log.exception("No se pudo publicar el evento en Redis; entregado solo en este proceso")
+                self._entregar_local(mensaje["user_ids"], mensaje["evento"])
+
+    async def _escuchar(self):
+        # Si se pierde la suscripción se reintenta con espera creciente. Los eventos de otros workers
+        # publicados mientras tanto se han perdido: al volver, las conexiones locales reciben un resync.
+        espera, reconectando = ESPERA_REDIS_MIN_S, False
+        while True:
+            pubsub = self._cliente.pubsub()
+            try:
+                await pubsub.subscribe(self.CANAL)
+                if reconectando:
+                    log.info("Suscripción a Redis recuperada")
+                    self._entregar_local(self._usuarios_conectados(), RESYNC)
+                espera, reconectando = ESPERA_REDIS_MIN_S, False
+                async for mensaje in pubsub.listen():
+                    if mensaje["type"] == "message":
+                        datos = json.loads(mensaje["data"])
+                        self._entregar_local(datos["user_ids"], datos["evento"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Suscripción a Redis perdida; reintento en %.1f s", espera)
+            finally:
+                with contextlib.suppress(Exception): await pubsub.aclose()
+            reconectando = True
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, ESPERA_REDIS_MAX_S)
+
+    def _usuarios_conectados(self):
+        with self._lock:
+            return list(self._suscripciones)
+
+    async def detener(self):
+        for tarea in self._tareas: tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        if self._cliente is not None: await self._cliente.aclose()
+        self._cliente = self._loop = None
+
+broker = BrokerRedis(EVENT_BROKER_URL) if EVENT_BROKER_URL.startswith(("redis://", "rediss://")) else BrokerEnMemoria()
+
+def publicar(user_ids: Iterable[int], tipo: str, **datos):
+    # La escritura ya está confirmada: un fallo aquí solo puede costar el evento, nunca la respuesta
+    try:
+        broker.publicar({u for u in user_ids if u is not None}, {"tipo": tipo, **datos})
+    except Exception:
+        log.exception("No se pudo publicar el evento %s", tipo)
@@ -0,0 +1,65 @@
+# hashing.py
+import asyncio, os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# --- Configuración del Hashing ---
+# Coste de bcrypt. Los hashes guardados con otro coste se re-hashean al iniciar sesión.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# "thread" o "process" (un pool de procesos usa varios núcleos sin pelear por el GIL)
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Peticiones que pueden esperar turno; si la cola está llena respondemos 503 al instante
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "32"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                           bcrypt__default_rounds=BCRYPT_ROUNDS,
+                           bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
+
+# --- Funciones síncronas (se ejecutan dentro del pool) ---
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+def verify_and_update(plain_password, hashed_password):
+    """Devuelve (válida, nuevo_hash). nuevo_hash no es None si el coste configurado cambió."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# --- Pool dedicado con control de admisión ---
+_executor = None
+_executor_lock = Lock()
+_slots = BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_SIZE)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            pool_cls = ProcessPoolExecutor if HASH_EXECUTOR == "process" else ThreadPoolExecutor
+            _executor = pool_cls(max_workers=HASH_WORKERS)
+        return _executor
+
+async def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Servidor ocupado, inténtalo de nuevo en unos segundos", headers={"Retry-After": "1"})
+    try:
+        return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+    finally:
+        _slots.release()
+
+async def get_password_hash_async(password):
+    return await _run(get_password_hash, password)
+
+async def verify_and_update_async(plain_password, hashed_password):
+    return await _run(verify_and_update, plain_password, hashed_password)
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -1,82 +1,477 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, FastAPI, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import asyncio, json, time
+import anyio
 
-import crud, models, schemas, auth
-from database import engine, get_db
+import crud, models, schemas, auth, hashing, busqueda, etags, estaticos, eventos, metricas, serializacion
+import database
+from database import ASYNC_MODE, engine, get_db, get_read_db
 
 models.Base.metadata.create_all(bind=engine)
+# create_all no añade índices nuevos a tablas existentes; los creamos si faltan
+for index in models.Tarea.__table__.indexes: index.create(bind=engine, checkfirst=True)
+busqueda.crear_indice_busqueda(engine)
 app = FastAPI(title="Plataforma Colaborativa de Tareas", version="7.0.0")
+# Latencia por ruta, SQL por petición y perfilado bajo demanda; se leen en GET /metrics
+metricas.instrumentar_sql()
+app.add_middleware(metricas.MiddlewareMetricas)
+
+@app.on_event("startup")
+async def iniciar_broker_eventos(): await eventos.broker.iniciar()
+
+@app.on_event("shutdown")
+async def cerrar_recursos():
+    hashing.shutdown()
+    await eventos.broker.detener()
 
 # --- Autenticación ---
+# El hashing (bcrypt, CPU intensivo) va a su propio pool acotado para no ocupar los hilos
+# que atienden el resto de rutas; las consultas a la BD siguen en el threadpool habitual.
 @app.post("/users/register", response_model=schemas.User, tags=["Autenticación"])
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if db_user: raise HTTPException(status_code=400, detail="El email ya está registrado")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await hashing.get_password_hash_async(user.password)
+    db_user = await run_in_threadpool(crud.create_user, db=db, user=user, hashed_password=hashed_password)
+    # Un email re-registrado no debe heredar principales cacheados de una cuenta anterior
+    auth.invalidate_user(email=db_user.email)
+    return db_user
 
 @app.post("/token", response_model=schemas.Token, tags=["Autenticación"])
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=form_data.username)
+    valid, new_hash = await hashing.verify_and_update_async(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(status_code=401, detail="Email o contraseña incorrectos", headers={"WWW-Authenticate": "Bearer"})
+    # Re-hash transparente si el coste de bcrypt configurado cambió
+    if new_hash: await run_in_threadpool(crud.update_user_password_hash, db, user, new_hash)
     access_token = auth.create_access_token(data={"sub": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
 
+# --- Operaciones en Lote ---
+# Un lote es una transacción: los permisos se comprueban por adelantado con una consulta por lote
+# (mismas reglas que las rutas individuales) y los elementos válidos se escriben con sentencias
+# multi-fila y un solo commit. Se registran antes que /tareas/{tarea_id} para que "lote" no se tome por un id.
+lote_router = APIRouter()
+
+def _comprobar_tamano_lote(n: int):
+    if n > schemas.MAX_LOTE: raise HTTPException(status_code=400, detail=f"Un lote no puede tener más de {schemas.MAX_LOTE} elementos")
+
+def _resultado(indice: int, id: Optional[int], status_code: int = 200, detalle: Optional[str] = None):
+    return {"indice": indice, "id": id, "ok": status_code < 400, "status": status_code, "detalle": detalle}
+
+@lote_router.post("/tareas/lote/crear", response_model=schemas.ResultadoLote, tags=["Lotes"])
+def crear_tareas_en_lote(lote: schemas.LoteCreacion, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    _comprobar_tamano_lote(len(lote.tareas))
+    ids = crud.create_tareas_bulk(db, lote.tareas, user_id=current_user.id)
+    creador = {"id": current_user.id, "email": current_user.email}
+    for tarea_id, t in zip(ids, lote.tareas):
+        eventos.publicar([current_user.id], "tarea_creada", tarea={**t.dict(), "id": tarea_id, "creator_id": current_user.id, "assignees": [creador]})
+    return {"resultados": [_resultado(i, tarea_id, 201) for i, tarea_id in enumerate(ids)]}
+
+@lote_router.post("/tareas/lote/actualizar", response_model=schemas.ResultadoLote, tags=["Lotes"])
+def actualizar_tareas_en_lote(lote: schemas.LoteActualizacion, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    _comprobar_tamano_lote(len(lote.tareas))
+    permisos = crud.get_permisos_tareas(db, [t.id for t in lote.tareas], user_id=current_user.id)
+    resultados, cambios = [], []
+    for i, t in enumerate(lote.tareas):
+        campos = t.dict(exclude_unset=True)
+        nulos = [k for k, v in campos.items() if v is None]
+        if nulos: resultados.append(_resultado(i, t.id, 422, f"No pueden ser null: {', '.join(nulos)}"))
+        elif t.id not in permisos: resultados.append(_resultado(i, t.id, 404, "Tarea no encontrada"))
+        elif not any(permisos[t.id]): resultados.append(_resultado(i, t.id, 403, "No tienes permiso para editar esta tarea"))
+        else:
+            cambios.append(campos)
+            resultados.append(_resultado(i, t.id))
+    crud.update_tareas_bulk(db, cambios)
+    destinatarios = crud.destinatarios_por_tarea(db, [c["id"] for c in cambios])
+    for c in cambios:
+        eventos.publicar(destinatarios.get(c["id"], ()), "tarea_actualizada", tarea_id=c["id"], cambios={k: v for k, v in c.items() if k != "id"})
+    return {"resultados": resultados}
+
+@lote_router.post("/tareas/lote/eliminar", response_model=schemas.ResultadoLote, tags=["Lotes"])
+def eliminar_tareas_en_lote(lote: schemas.LoteEliminacion, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    _comprobar_tamano_lote(len(lote.ids))
+    creadores = crud.get_creadores_tareas(db, lote.ids)
+    resultados, a_eliminar = [], []
+    for i, tarea_id in enumerate(lote.ids):
+        if tarea_id not in creadores: resultados.append(_resultado(i, tarea_id, 404, "Tarea no encontrada"))
+        elif creadores[tarea_id] != current_user.id: resultados.append(_resultado(i, tarea_id, 403, "Solo el creador puede eliminar la tarea"))
+        else:
+            a_eliminar.append(tarea_id)
+            resultados.append(_resultado(i, tarea_id, 204))
+    destinatarios = crud.destinatarios_por_tarea(db, a_eliminar)
+    crud.delete_tareas_bulk(db, a_eliminar)
+    for tarea_id in a_eliminar: eventos.publicar(destinatarios.get(tarea_id, ()), "tarea_eliminada", tarea_id=tarea_id)
+    return {"resultados": resultados}
+
+def _pares_asignacion(lote: schemas.LoteAsignacion, db: Session, current_user: auth.Principal, quitar: bool):
+    """Valida cada elemento del lote y devuelve (resultados, {(task_id, user_id)} a aplicar, {user_id: email})."""
+    _comprobar_tamano_lote(len(lote.asignaciones))
+    _comprobar_tamano_lote(sum(len(a.emails) for a in lote.asignaciones))
+    creadores = crud.get_creadores_tareas(db, [a.tarea_id for a in lote.asignaciones])
+    usuarios = crud.get_user_ids_by_emails(db, [e for a in lote.asignaciones for e in a.emails])
+    resultados, pares = [], set()
+    for i, a in enumerate(lote.asignaciones):
+        faltan = [e for e in a.emails if e not in usuarios]
+        if a.tarea_id not in creadores: resultados.append(_resultado(i, a.tarea_id, 404, "Tarea no encontrada"))
+        elif creadores[a.tarea_id] != current_user.id:
+            accion = "quitar asignaciones" if quitar else "asignar usuarios"
+            resultados.append(_resultado(i, a.tarea_id, 403, f"Solo el creador puede {accion}"))
+        elif faltan: resultados.append(_resultado(i, a.tarea_id, 404, f"Usuarios no encontrados: {', '.join(faltan)}"))
+        elif quitar and creadores[a.tarea_id] in {usuarios[e] for e in a.emails}:
+            resultados.append(_resultado(i, a.tarea_id, 400, "No se puede quitar al creador de la tarea"))
+        else:
+            pares.update((a.tarea_id, usuarios[e]) for e in a.emails)
+            resultados.append(_resultado(i, a.tarea_id))
+    return resultados, pares, {user_id: email for email, user_id in usuarios.items()}
+
+@lote_router.post("/tareas/lote/assign", response_model=schemas.ResultadoLote, tags=["Lotes"])
+def asignar_usuarios_en_lote(lote: schemas.LoteAsignacion, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    resultados, pares, emails = _pares_asignacion(lote, db, current_user, quitar=False)
+    crud.add_assignments_bulk(db, pares)
+    destinatarios = crud.destinatarios_por_tarea(db, {t for t, _ in pares})
+    for tarea_id, user_id in pares:
+        eventos.publicar(destinatarios.get(tarea_id, ()), "asignado_agregado", tarea_id=tarea_id, usuario={"id": user_id, "email": emails[user_id]})
+    return {"resultados": resultados}
+
+@lote_router.post("/tareas/lote/unassign", response_model=schemas.ResultadoLote, tags=["Lotes"])
+def quitar_asignaciones_en_lote(lote: schemas.LoteAsignacion, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    resultados, pares, emails = _pares_asignacion(lote, db, current_user, quitar=True)
+    destinatarios = crud.destinatarios_por_tarea(db, {t for t, _ in pares})
+    crud.remove_assignments_bulk(db, pares)
+    for tarea_id, user_id in pares:
+        eventos.publicar(destinatarios.get(tarea_id, ()), "asignado_quitado", tarea_id=tarea_id, usuario={"id": user_id, "email": emails[user_id]})
+    return {"resultados": resultados}
+
+app.include_router(lote_router)
+
+# --- Búsqueda ---
+# También antes de /tareas/{tarea_id}, por el mismo motivo que los lotes.
+busqueda_router = APIRouter()
+
+@busqueda_router.get("/tareas/buscar", response_model=List[schemas.Tarea], tags=["Tareas"])
+def buscar_tareas(q: str = Query(..., min_length=1, max_length=200), pagina: int = Query(1, ge=1), limite: int = Query(20, ge=1, le=100),
+                  db: Session = Depends(get_read_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    """Búsqueda de texto en título y descripción, por relevancia, entre las tareas creadas o asignadas."""
+    return serializacion.respuesta(crud.buscar_tareas(db, user_id=current_user.id, q=q, pagina=pagina, limite=limite))
+
+app.include_router(busqueda_router)
+
+# --- Eventos en tiempo real ---
+# WebSocket y, como alternativa, SSE. Las credenciales nunca van en la URL (los logs de acceso la
+# guardan entera): el WebSocket lleva el token en Sec-WebSocket-Protocol y el SSE usa Authorization o,
+# desde el navegador (EventSource no admite cabeceras), un ticket de un solo uso. El canal se cierra
+# cuando caduca el token de la sesión.
+eventos_router = APIRouter()
+SUBPROTOCOLO_EVENTOS = "tareas"  # el cliente pide ["tareas", <token>] y el servidor acepta "tareas"
+
+async def _autenticar_canal(token: str):
+    principal = await run_in_threadpool(auth.principal_from_token, token)
+    return principal, auth.token_expiration(token)
+
+async def _enviar_eventos(websocket: WebSocket, suscripcion: eventos.Suscripcion):
+    try:
+        while True: await websocket.send_text(json.dumps(await suscripcion.siguiente()))
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # conexión cerrada: _esperar_cierre recibirá el disconnect
+
+async def _esperar_cierre(websocket: WebSocket):
+    # El cliente no envía nada; leer solo sirve para detectar que ha cerrado la conexión
+    try:
+        while True: await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+@eventos_router.websocket("/ws/tareas")
+async def ws_eventos_tareas(websocket: WebSocket):
+    protocolos = websocket.scope.get("subprotocols") or []
+    try:
+        if len(protocolos) != 2 or protocolos[0] != SUBPROTOCOLO_EVENTOS: raise HTTPException(status_code=401)
+        principal, expira = await _autenticar_canal(protocolos[1])
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept(subprotocol=SUBPROTOCOLO_EVENTOS)
+    suscripcion = eventos.broker.suscribir(principal.id)
+    try:
+        with anyio.move_on_after(max(0, expira - time.time())) as plazo:
+            async with anyio.create_task_group() as tareas:
+                tareas.start_soon(_enviar_eventos, websocket, suscripcion)
+                await _esperar_cierre(websocket)
+                tareas.cancel_scope.cancel()
+        if plazo.cancelled_caught:  # token caducado: el cliente debe reconectar con uno nuevo
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expirado")
+    finally:
+        eventos.broker.cancelar(suscripcion)
+
+@eventos_router.post("/tareas/eventos/ticket", response_model=schemas.TicketEventos, tags=["Tareas"])
+def ticket_eventos(current_user: auth.Principal = Depends(auth.get_current_user), token: str = Depends(auth.oauth2_scheme)):
+    """Ticket de un solo uso para abrir /tareas/eventos?ticket=... desde un EventSource."""
+    return {"ticket": auth.crear_ticket_eventos(current_user, token), "expira_en": auth.TICKET_EVENTOS_TTL_SECONDS}
+
+@eventos_router.get("/tareas/eventos", tags=["Tareas"])
+async def sse_eventos_tareas(request: Request, ticket: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    """Stream SSE (text/event-stream) con los mismos eventos que /ws/tareas, para clientes sin WebSocket."""
+    if ticket:
+        principal, expira = await run_in_threadpool(auth.principal_from_ticket, ticket)
+    elif authorization and authorization.lower().startswith("bearer "):
+        principal, expira = await _autenticar_canal(authorization[7:])
+    else:
+        raise HTTPException(status_code=401, detail="No se pudieron validar las credenciales", headers={"WWW-Authenticate": "Bearer"})
+
+    async def flujo():
+        suscripcion = eventos.broker.suscribir(principal.id)
+        try:
+            yield "retry: 3000\n\n"
+            while time.time() < expira and not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(suscripcion.siguiente(), timeout=min(eventos.SSE_HEARTBEAT_S, max(0.1, expira - time.time())))
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {json.dumps(evento)}\n\n"
+        finally:
+            eventos.broker.cancelar(suscripcion)
+    return StreamingResponse(flujo(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+app.include_router(eventos_router)
+
+# --- Exportación / Importación (NDJSON) ---
+# Una tarea por línea, en streaming en ambos sentidos: ni la exportación ni la importación cargan
+# la colección entera en memoria. También antes de /tareas/{tarea_id}.
+ndjson_router = APIRouter()
+
+@ndjson_router.get("/tareas/exportar", response_class=StreamingResponse, tags=["Exportación"])
+def exportar_tareas(completada: Optional[bool] = None, alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas,
+                    current_user: auth.Principal = Depends(auth.get_current_user)):
+    """Todas las tareas visibles en NDJSON, con el mismo formato que GET /tareas."""
+    def lineas():
+        # Sesión propia: la de Depends(get_db) se cierra antes de que termine el streaming
+        db = database.ReadSessionLocal()
+        try:
+            for bloque in crud.iter_tareas_exportacion(db, current_user.id, completada, alcance):
+                yield b"".join(serializacion.dumps(t) + b"\n" for t in bloque)
+        finally:
+            db.close()
+    return StreamingResponse(lineas(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="tareas.ndjson"'})
+
+async def _lineas_ndjson(request: Request):
+    """(número de línea, bytes) del cuerpo según llega; None si la línea supera MAX_LINEA_IMPORTACION."""
+    pendiente, n, descartando = b"", 0, False
+    async for trozo in request.stream():
+        *lineas, pendiente = (pendiente + trozo).split(b"\n")
+        for linea in lineas:
+            n += 1
+            yield n, None if descartando or len(linea) > schemas.MAX_LINEA_IMPORTACION else linea
+            descartando = False
+        if len(pendiente) > schemas.MAX_LINEA_IMPORTACION: pendiente, descartando = b"", True
+    if descartando or pendiente.strip(): yield n + 1, None if descartando else pendiente
+
+def _detalle_validacion(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'] if p != '__root__') or 'línea'}: {e['msg']}" for e in error.errors())
+
+def _importar_bloque(db: Session, user_id: int, bloque):
+    """Escribe un bloque [(línea, TareaImportacion)] en una transacción. Devuelve (importadas, errores, afectados)."""
+    emails = {a.email for _, t in bloque for a in t.assignees}
+    ids_por_email = crud.get_user_ids_by_emails(db, emails) if emails else {}
+    validas, errores = [], []
+    for n, t in bloque:
+        desconocidos = sorted({a.email for a in t.assignees} - ids_por_email.keys())
+        if desconocidos: errores.append({"linea": n, "detalle": f"Usuarios no encontrados: {', '.join(desconocidos)}"})
+        else: validas.append((n, t))
+    asignados = [{ids_por_email[a.email] for a in t.assignees} for _, t in validas]
+    try:
+        crud.importar_tareas(db, [t for _, t in validas], asignados, user_id)
+    except SQLAlchemyError:
+        db.rollback()
+        return 0, errores + [{"linea": n, "detalle": "Error al guardar el bloque"} for n, _ in validas], set()
+    return len(validas), errores, {user_id, *(u for usuarios in asignados for u in usuarios)}
+
+@ndjson_router.post("/tareas/importar", response_model=schemas.ResultadoImportacion, tags=["Exportación"])
+async def importar_tareas(request: Request, lote: int = Query(500, ge=1, le=schemas.MAX_LOTE),
+                          db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    """Crea tareas desde un cuerpo NDJSON (p. ej. el de /tareas/exportar) con un commit cada `lote` líneas.
+    Las líneas inválidas se informan en `errores` (hasta MAX_ERRORES_IMPORTACION) sin detener la importación."""
+    resultado = {"importadas": 0, "total_errores": 0, "errores": []}
+    bloque, afectados = [], set()
+
+    def anotar_errores(errores):
+        resultado["total_errores"] += len(errores)
+        hueco = schemas.MAX_ERRORES_IMPORTACION - len(resultado["errores"])
+        resultado["errores"].extend(errores[:max(0, hueco)])
+
+    async def volcar():
+        importadas, errores, usuarios = await run_in_threadpool(_importar_bloque, db, current_user.id, list(bloque))
+        bloque.clear()
+        resultado["importadas"] += importadas
+        anotar_errores(errores)
+        afectados.update(usuarios)
+
+    try:
+        async for n, linea in _lineas_ndjson(request):
+            if linea is None:
+                anotar_errores([{"linea": n, "detalle": f"Línea de más de {schemas.MAX_LINEA_IMPORTACION} bytes"}])
+                continue
+            if not linea.strip(): continue
+            try:
+                bloque.append((n, schemas.TareaImportacion.parse_raw(linea)))
+            except ValidationError as e:
+                anotar_errores([{"linea": n, "detalle": _detalle_validacion(e)}])
+            if len(bloque) >= lote: await volcar()
+        if bloque: await volcar()
+    finally:
+        # Un solo evento al terminar en lugar de uno por bloque o por tarea: los clientes recargan la lista
+        # una vez. También si la importación se corta a medias, porque los bloques ya confirmados se quedan.
+        if afectados: eventos.publicar(afectados, "resync")
+    resultado["errores"].sort(key=lambda e: e["linea"])
+    return resultado
+
+app.include_router(ndjson_router)
+
 # --- Tareas ---
-@app.post("/tareas", response_model=schemas.Tarea, tags=["Tareas"])
-def crear_una_tarea(tarea: schemas.TareaCreacion, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return crud.create_tarea(db=db, tarea=tarea, user_id=current_user.id)
+tareas_router = APIRouter()
 
-@app.get("/tareas", response_model=List[schemas.Tarea], tags=["Tareas"])
-def leer_tareas_del_usuario(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return crud.get_tareas_for_user(db, user_id=current_user.id)
+@tareas_router.post("/tareas", response_model=schemas.Tarea, tags=["Tareas"])
+def crear_una_tarea(tarea: schemas.TareaCreacion, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    db_tarea = crud.create_tarea(db=db, tarea=tarea, user_id=current_user.id, user_email=current_user.email)
+    eventos.publicar([current_user.id], "tarea_creada", tarea=db_tarea)
+    return db_tarea
 
-@app.put("/tareas/{tarea_id}", response_model=schemas.Tarea, tags=["Tareas"])
-def actualizar_una_tarea(tarea_id: int, tarea_data: schemas.TareaCreacion, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_tarea = crud.get_tarea_by_id(db, tarea_id=tarea_id)
+@tareas_router.get("/tareas", response_model=List[schemas.Tarea], tags=["Tareas"])
+def leer_tareas_del_usuario(response: Response, completada: Optional[bool] = None,
+                            alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas,
+                            despues_de: Optional[int] = Query(None, ge=0, description="Cursor: id de la última tarea de la página anterior"),
+                            limite: int = Query(100, ge=1, le=500), if_none_match: Optional[str] = Header(None),
+                            db: Session = Depends(get_read_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    # Sin cambios desde la última lectura: 304 sin consultar las tablas de tareas
+    etag = etags.etag_tareas(current_user.id, crud.get_version_usuario(db, current_user.id), "lista", completada, alcance.value, despues_de, limite)
+    if etags.coincide(if_none_match, etag): return etags.no_modificado(etag)
+    tareas = crud.get_tareas_for_user(db, user_id=current_user.id, completada=completada, alcance=alcance, despues_de=despues_de, limite=limite)
+    # Si la página está llena puede haber más: el cliente pide la siguiente con ?despues_de=<cursor>
+    if len(tareas) == limite: response.headers["X-Siguiente-Cursor"] = str(tareas[-1]["id"])
+    etags.marcar(response, etag)
+    return serializacion.respuesta(tareas, response)
+
+@tareas_router.get("/tareas/{tarea_id}", response_model=schemas.Tarea, tags=["Tareas"])
+def leer_una_tarea(tarea_id: int, response: Response, if_none_match: Optional[str] = Header(None),
+                   db: Session = Depends(get_read_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    # Cualquier cambio de acceso (p. ej. quitar la asignación) sube la versión, así que el 304 es seguro
+    etag = etags.etag_tareas(current_user.id, crud.get_version_usuario(db, current_user.id), "tarea", tarea_id)
+    if etags.coincide(if_none_match, etag): return etags.no_modificado(etag)
+    db_tarea = crud.get_tarea_dict(db, tarea_id)
     if not db_tarea: raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    if db_tarea["creator_id"] != current_user.id and all(u["id"] != current_user.id for u in db_tarea["assignees"]):
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver esta tarea")
+    etags.marcar(response, etag)
+    return serializacion.respuesta(db_tarea, response)
+
+# Las escrituras llevan la autorización dentro de la sentencia (ver crud.py); si no afectan a ninguna
+# fila, estas funciones averiguan el motivo con una consulta más y lanzan el error de la ruta.
+def _comprobar_edicion(db: Session, tarea_id: int, user_id: int):
     # Solo el creador o un asignado puede editar
-    if current_user not in db_tarea.assignees and db_tarea.creator_id != current_user.id:
-        raise HTTPException(status_code=403, detail="No tienes permiso para editar esta tarea")
-    return crud.update_tarea(db, tarea=db_tarea, tarea_data=tarea_data)
+    permiso = crud.get_permiso_tarea(db, tarea_id, user_id)
+    if permiso is None: raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    if not any(permiso): raise HTTPException(status_code=403, detail="No tienes permiso para editar esta tarea")
 
-@app.delete("/tareas/{tarea_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Tareas"])
-def eliminar_una_tarea(tarea_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_tarea = crud.get_tarea_by_id(db, tarea_id=tarea_id)
-    if not db_tarea: raise HTTPException(status_code=404, detail="Tarea no encontrada")
-    if db_tarea.creator_id != current_user.id:
+def _error_asignacion(db: Session, tarea_id: int, user_id: int, email: str, quitar: bool):
+    """Lanza el error que corresponda; si no hay error (ya asignado / no estaba asignado) no hace nada."""
+    creator_id, id_usuario = crud.diagnosticar_asignacion(db, tarea_id, email)
+    if creator_id is None: raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    if creator_id != user_id:
+        raise HTTPException(status_code=403, detail=f"Solo el creador puede {'quitar asignaciones' if quitar else 'asignar usuarios'}")
+    if id_usuario is None: raise HTTPException(status_code=404, detail=f"Usuario a {'quitar' if quitar else 'asignar'} no encontrado")
+    if quitar and id_usuario == creator_id: raise HTTPException(status_code=400, detail="No se puede quitar al creador de la tarea")
+
+def _actualizar(tarea_id: int, cambios: dict, db: Session, current_user: auth.Principal):
+    if not cambios:  # PATCH vacío: nada que escribir
+        _comprobar_edicion(db, tarea_id, current_user.id)
+        return crud.get_tarea_dict(db, tarea_id)
+    db_tarea = crud.update_tarea(db, tarea_id, current_user.id, cambios)
+    if db_tarea is None:
+        _comprobar_edicion(db, tarea_id, current_user.id)
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")  # borrada entre medias
+    eventos.publicar([u["id"] for u in db_tarea["assignees"]] + [db_tarea["creator_id"]], "tarea_actualizada", tarea_id=tarea_id, cambios=cambios)
+    return db_tarea
+
+@tareas_router.put("/tareas/{tarea_id}", response_model=schemas.Tarea, tags=["Tareas"])
+def actualizar_una_tarea(tarea_id: int, tarea_data: schemas.TareaCreacion, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    return _actualizar(tarea_id, tarea_data.dict(), db, current_user)
+
+@tareas_router.patch("/tareas/{tarea_id}", response_model=schemas.Tarea, tags=["Tareas"])
+def actualizar_parcialmente_una_tarea(tarea_id: int, tarea_data: schemas.TareaActualizacionParcial, db: Session = Depends(get_db),
+                                      current_user: auth.Principal = Depends(auth.get_current_user)):
+    """Solo modifica los campos enviados (p. ej. {"completada": true})."""
+    return _actualizar(tarea_id, tarea_data.dict(exclude_unset=True), db, current_user)
+
+@tareas_router.delete("/tareas/{tarea_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Tareas"])
+def eliminar_una_tarea(tarea_id: int, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    destinatarios = crud.delete_tarea(db, tarea_id, current_user.id)
+    if destinatarios is None:
+        if crud.get_permiso_tarea(db, tarea_id, current_user.id) is None: raise HTTPException(status_code=404, detail="Tarea no encontrada")
         raise HTTPException(status_code=403, detail="Solo el creador puede eliminar la tarea")
-    crud.delete_tarea(db, tarea=db_tarea)
+    eventos.publicar(destinatarios, "tarea_eliminada", tarea_id=tarea_id)
     return
 
 # --- Asignaciones ---
-@app.post("/tareas/{tarea_id}/assign", response_model=schemas.Tarea, tags=["Asignaciones"])
-def asignar_usuario(tarea_id: int, request: schemas.AssignRequest, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_tarea = crud.get_tarea_by_id(db, tarea_id=tarea_id)
-    if not db_tarea: raise HTTPException(status_code=404, detail="Tarea no encontrada")
-    if db_tarea.creator_id != current_user.id: raise HTTPException(status_code=403, detail="Solo el creador puede asignar usuarios")
-    user_to_assign = crud.get_user_by_email(db, email=request.email)
-    if not user_to_assign: raise HTTPException(status_code=404, detail="Usuario a asignar no encontrado")
-    return crud.assign_user_to_task(db, tarea=db_tarea, user_to_assign=user_to_assign)
-
-@app.post("/tareas/{tarea_id}/unassign", response_model=schemas.Tarea, tags=["Asignaciones"])
-def quitar_asignacion(tarea_id: int, request: schemas.AssignRequest, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_tarea = crud.get_tarea_by_id(db, tarea_id=tarea_id)
-    if not db_tarea: raise HTTPException(status_code=404, detail="Tarea no encontrada")
-    if db_tarea.creator_id != current_user.id: raise HTTPException(status_code=403, detail="Solo el creador puede quitar asignaciones")
-    user_to_remove = crud.get_user_by_email(db, email=request.email)
-    if not user_to_remove: raise HTTPException(status_code=404, detail="Usuario a quitar no encontrado")
-    if db_tarea.creator_id == user_to_remove.id: raise HTTPException(status_code=400, detail="No se puede quitar al creador de la tarea")
-    return crud.remove_user_from_task(db, tarea=db_tarea, user_to_remove=user_to_remove)
+@tareas_router.post("/tareas/{tarea_id}/assign", response_model=schemas.Tarea, tags=["Asignaciones"])
+def asignar_usuario(tarea_id: int, request: schemas.AssignRequest, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    db_tarea = crud.assign_user_to_task(db, tarea_id, current_user.id, request.email)
+    if db_tarea is None:
+        _error_asignacion(db, tarea_id, current_user.id, request.email, quitar=False)
+        return crud.get_tarea_dict(db, tarea_id)  # ya estaba asignado
+    usuario = next(u for u in db_tarea["assignees"] if u["email"] == request.email)
+    eventos.publicar([u["id"] for u in db_tarea["assignees"]] + [db_tarea["creator_id"]], "asignado_agregado", tarea_id=tarea_id, usuario=usuario)
+    return db_tarea
+
+@tareas_router.post("/tareas/{tarea_id}/unassign", response_model=schemas.Tarea, tags=["Asignaciones"])
+def quitar_asignacion(tarea_id: int, request: schemas.AssignRequest, db: Session = Depends(get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    resultado = crud.remove_user_from_task(db, tarea_id, current_user.id, request.email)
+    if resultado is None:
+        _error_asignacion(db, tarea_id, current_user.id, request.email, quitar=True)
+        return crud.get_tarea_dict(db, tarea_id)  # no estaba asignado
+    db_tarea, quitado = resultado
+    eventos.publicar([u["id"] for u in db_tarea["assignees"]] + [db_tarea["creator_id"], quitado], "asignado_quitado",
+                     tarea_id=tarea_id, usuario={"id": quitado, "email": request.email})
+    return db_tarea
+
+# En modo async las rutas de rutas_async.py sustituyen a sus equivalentes síncronas;
+# las que aún no tienen versión async siguen registrándose desde aquí.
+if ASYNC_MODE:
+    import rutas_async
+    app.include_router(rutas_async.router)
+    portadas = {(r.path, m) for r in rutas_async.router.routes for m in r.methods}
+    tareas_router.routes = [r for r in tareas_router.routes if not any((r.path, m) in portadas for m in r.methods)]
+app.include_router(tareas_router)
 
 # --- Frontend y Health Check ---
 @app.get("/health", tags=["Supervisión"])
 def health_check(): return {"status": "ok"}
-app.mount("/static", StaticFiles(directory="static"), name="static")
-@app.get("/", response_class=FileResponse, include_in_schema=False)
-async def root(): return "static/index.html"
\ No newline at end of file
+@app.get("/health/cache", tags=["Supervisión"])
+def estadisticas_cache_auth(): return {"principal_cache": auth.principal_cache.stats()}
+@app.get("/health/db", tags=["Supervisión"])
+def estadisticas_pool_db(): return {"pools": database.pool_stats()}
+@app.get("/health/eventos", tags=["Supervisión"])
+def estadisticas_eventos(): return {"conexiones": eventos.broker.conexiones()}
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Supervisión"])
+def metricas_prometheus():
+    cache = auth.principal_cache.stats()
+    pools = database.pool_stats()
+    extra = [linea for k, v in cache.items() for linea in metricas.gauge(f"auth_principal_cache_{k}", f"Caché de principales: {k}", [({}, v)])]
+    for k in next(iter(pools.values()), {}):
+        extra += metricas.gauge(f"db_pool_{k}", f"Pool de conexiones: {k}", [({"pool": nombre}, datos[k]) for nombre, datos in pools.items()])
+    extra += metricas.gauge("eventos_conexiones", "Conexiones WebSocket/SSE abiertas", [({}, eventos.broker.conexiones())])
+    return PlainTextResponse(metricas.exponer(extra), media_type="text/plain; version=0.0.4")
+estaticos.precomprimir("static")
+index_html = estaticos.IndexVersionado("static")
+app.mount("/static", estaticos.StaticFilesCacheables(directory="static"), name="static")
+@app.get("/", response_class=HTMLResponse, include_in_schema=False)
+async def root(if_none_match: Optional[str] = Header(None)): return index_html.respuesta(if_none_match)
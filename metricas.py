@@ -0,0 +1,223 @@
+# metricas.py
+# Instrumentación por petición, expuesta en formato Prometheus en GET /metrics:
+#
+# - MiddlewareMetricas: latencia por ruta (plantilla, no URL concreta) y, vía un contextvar, número de
+#   sentencias SQL y tiempo de BD de cada petición. Añade la cabecera Server-Timing con esos datos.
+# - instrumentar_sql(): hooks de eventos de SQLAlchemy que alimentan lo anterior y registran las
+#   consultas lentas (SQL_LENTA_MS) con el SQL normalizado en el logger "tareas.sql_lenta".
+# - Perfilado opcional: con PERFIL_TOKEN definido, una petición con la cabecera `X-Perfil: <token>`
+#   (o una fracción PERFIL_MUESTREO de todas) se perfila con un muestreador de pilas; el resultado
+#   se guarda en PERFIL_DIR en formato "folded" (flamegraph.pl, speedscope) y su nombre vuelve en X-Perfil.
+import logging, os, random, re, sys, tempfile, threading, time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "100"))
+PERFIL_TOKEN = os.getenv("PERFIL_TOKEN", "")
+PERFIL_MUESTREO = float(os.getenv("PERFIL_MUESTREO", "0"))
+PERFIL_DIR = os.getenv("PERFIL_DIR", os.path.join(tempfile.gettempdir(), "perfiles_tareas"))
+PERFIL_INTERVALO_S = float(os.getenv("PERFIL_INTERVALO_MS", "5")) / 1000
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_SQL = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+log_sql_lenta = logging.getLogger("tareas.sql_lenta")
+
+# --- Histogramas ---
+class Histograma:
+    """Histograma acumulativo con etiquetas, seguro entre hilos."""
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.nombre, self.ayuda, self.etiquetas, self.buckets = nombre, ayuda, etiquetas, buckets
+        self._series: Dict[tuple, list] = {}  # valores de etiquetas -> [cuenta por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_etiquetas):
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None: serie = self._series[valores_etiquetas] = [0] * (len(self.buckets) + 2)
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite: serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exponer(self) -> Iterable[str]:
+        yield f"# HELP {self.nombre} {self.ayuda}"
+        yield f"# TYPE {self.nombre} histogram"
+        with self._lock: series = {k: list(v) for k, v in self._series.items()}
+        for valores, serie in sorted(series.items()):
+            base = _etiquetas(zip(self.etiquetas, valores))
+            for limite, cuenta in zip(self.buckets, serie):
+                yield f"{self.nombre}_bucket{_etiquetas([*zip(self.etiquetas, valores), ('le', _numero(limite))])} {cuenta}"
+            yield f"{self.nombre}_bucket{_etiquetas([*zip(self.etiquetas, valores), ('le', '+Inf')])} {serie[-1]}"
+            yield f"{self.nombre}_sum{base} {_numero(serie[-2])}"
+            yield f"{self.nombre}_count{base} {serie[-1]}"
+
+def _numero(valor) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def _etiquetas(pares) -> str:
+    pares = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pares]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}" if pares else ""
+
+LATENCIA = Histograma("http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta",
+                      ("method", "ruta", "status"), BUCKETS_LATENCIA)
+SQL_POR_PETICION = Histograma("http_request_sql_queries", "Sentencias SQL ejecutadas por petición",
+                              ("method", "ruta"), BUCKETS_SQL)
+SQL_SEGUNDOS = Histograma("http_request_sql_seconds", "Tiempo de BD por petición", ("method", "ruta"), BUCKETS_LATENCIA)
+sql_lentas_total = 0
+
+# --- Contabilidad SQL por petición ---
+class EstadisticasPeticion:
+    __slots__ = ("consultas", "segundos_bd")
+    def __init__(self):
+        self.consultas, self.segundos_bd = 0, 0.0
+
+# Se fija en el middleware; las rutas síncronas lo heredan en el threadpool (se copia el contexto)
+# y el modo async lo ve dentro de los greenlets de SQLAlchemy. Es el mismo objeto, así que se acumula.
+peticion_actual: ContextVar[Optional[EstadisticasPeticion]] = ContextVar("peticion_actual", default=None)
+
+_NORMALIZACIONES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                      # literales de texto
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                    # literales numéricos
+    (re.compile(r"\(\s*(?:\?|%\([^)]+\)s|:\w+)(?:\s*,\s*(?:\?|%\([^)]+\)s|:\w+))*\s*\)"), "(...)"),  # IN (...) / VALUES (...)
+    (re.compile(r"(?:\(\.\.\.\)\s*,\s*)+\(\.\.\.\)"), "(...)"),  # VALUES multi-fila
+    (re.compile(r"\s+"), " "),
+]
+
+def normalizar_sql(sql: str) -> str:
+    """SQL sin valores concretos, para agrupar consultas lentas iguales."""
+    for patron, sustituto in _NORMALIZACIONES: sql = patron.sub(sustituto, sql)
+    return sql.strip()
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    global sql_lentas_total
+    duracion = time.perf_counter() - conn.info["metricas_inicio"].pop()
+    stats = peticion_actual.get()
+    if stats is not None:
+        stats.consultas += 1
+        stats.segundos_bd += duracion
+    if duracion * 1000 >= SQL_LENTA_MS:
+        sql_lentas_total += 1
+        log_sql_lenta.warning("SQL lenta (%.1f ms): %s", duracion * 1000, normalizar_sql(statement))
+
+def _error_al_ejecutar(contexto_excepcion):
+    conn = contexto_excepcion.connection
+    if conn is not None and conn.info.get("metricas_inicio"): conn.info["metricas_inicio"].pop()
+
+def instrumentar_sql():
+    """Engancha los eventos a todos los Engine (síncronos, réplica y el sync_engine del modo async)."""
+    if not event.contains(Engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(Engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(Engine, "after_cursor_execute", _despues_de_ejecutar)
+        event.listen(Engine, "handle_error", _error_al_ejecutar)
+
+# --- Perfilado por muestreo ---
+class MuestreadorPilas:
+    """Toma muestras de las pilas de todos los hilos mientras está activo. Ve tanto el event loop como
+    los hilos del threadpool (rutas síncronas); con carga concurrente incluye también otras peticiones."""
+    _OCIOSOS = ("threading.py", "selectors.py", "queue.py")
+
+    def __init__(self, intervalo: float = PERFIL_INTERVALO_S):
+        self.intervalo = intervalo
+        self.muestras: Counter = Counter()
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            for ident, frame in sys._current_frames().items():
+                if ident == propio or frame.f_code.co_filename.endswith(self._OCIOSOS): continue
+                pila = []
+                while frame is not None:
+                    pila.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})")
+                    frame = frame.f_back
+                self.muestras[";".join(reversed(pila))] += 1
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+
+    def guardar(self, nombre: str) -> str:
+        os.makedirs(PERFIL_DIR, exist_ok=True)
+        ruta = os.path.join(PERFIL_DIR, nombre)
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.writelines(f"{pila} {n}\n" for pila, n in self.muestras.most_common())
+        return ruta
+
+# Un solo perfil a la vez: el muestreador ve todos los hilos, dos a la vez se solaparían
+_perfil_lock = threading.Lock()
+
+def _quiere_perfil(scope) -> bool:
+    if not PERFIL_TOKEN: return False
+    for nombre, valor in scope.get("headers", ()):
+        if nombre == b"x-perfil": return valor.decode("latin-1") == PERFIL_TOKEN
+    return PERFIL_MUESTREO > 0 and random.random() < PERFIL_MUESTREO
+
+# --- Middleware ---
+def plantilla_ruta(scope) -> str:
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "sin_ruta"
+
+class MiddlewareMetricas:
+    """Middleware ASGI puro (sin BaseHTTPMiddleware, que añade una tarea por petición y rompe el streaming)."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        stats = EstadisticasPeticion()
+        token = peticion_actual.set(stats)
+        status, inicio = 500, time.perf_counter()
+        perfil = MuestreadorPilas() if _quiere_perfil(scope) and _perfil_lock.acquire(blocking=False) else None
+        nombre_perfil = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{id(stats):x}.folded" if perfil else None
+
+        async def send_instrumentado(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+                cabeceras = list(mensaje.get("headers", []))
+                cabeceras.append((b"server-timing", f'db;dur={stats.segundos_bd * 1000:.1f};desc="{stats.consultas} sql", '
+                                                    f'app;dur={(time.perf_counter() - inicio) * 1000:.1f}'.encode()))
+                if nombre_perfil: cabeceras.append((b"x-perfil", nombre_perfil.encode()))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        try:
+            if perfil is None:
+                await self.app(scope, receive, send_instrumentado)
+            else:
+                try:
+                    with perfil: await self.app(scope, receive, send_instrumentado)
+                finally:
+                    perfil.guardar(nombre_perfil)
+                    _perfil_lock.release()
+        finally:
+            peticion_actual.reset(token)
+            ruta, metodo = plantilla_ruta(scope), scope["method"]
+            LATENCIA.observar(time.perf_counter() - inicio, metodo, ruta, status)
+            SQL_POR_PETICION.observar(stats.consultas, metodo, ruta)
+            SQL_SEGUNDOS.observar(stats.segundos_bd, metodo, ruta)
+
+# --- Exposición ---
+def gauge(nombre: str, ayuda: str, muestras: Iterable[Tuple[dict, float]], tipo: str = "gauge") -> Iterable[str]:
+    yield f"# HELP {nombre} {ayuda}"
+    yield f"# TYPE {nombre} {tipo}"
+    for etiquetas, valor in muestras:
+        yield f"{nombre}{_etiquetas(etiquetas.items())} {_numero(valor)}"
+
+def exponer(extra: Iterable[str] = ()) -> str:
+    lineas = [*LATENCIA.exponer(), *SQL_POR_PETICION.exponer(), *SQL_SEGUNDOS.exponer(),
+              *gauge("sql_lentas_total", f"Consultas que superaron {SQL_LENTA_MS:g} ms", [({}, sql_lentas_total)], "counter"),
+              *extra]
+    return "\n".join(lineas) + "\n"
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Table
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Table
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -22,10 +22,20 @@ class Tarea(Base):
     __tablename__ = "tareas"
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String, index=True)
-    descripcion = Column(String, index=True)
+    descripcion = Column(String)  # búsqueda por texto: índice FTS5 / GIN en busqueda.py
     completada = Column(Boolean, default=False)
     
     creator_id = Column(Integer, ForeignKey("users.id"))
     creator = relationship("User", back_populates="created_tasks")
 
-    assignees = relationship("User", secondary=task_assignments, back_populates="assigned_tasks")
\ No newline at end of file
+    assignees = relationship("User", secondary=task_assignments, back_populates="assigned_tasks")
+
+    # Índice compuesto para el listado "creadas por mí" paginado por id
+    __table_args__ = (Index("ix_tareas_creator_id_id", "creator_id", "id"),)
+
+# Contador de cambios por usuario: sube con cada escritura que afecta a alguna de sus tareas.
+# De él salen los ETag de GET /tareas, así un 304 no necesita tocar las tablas de tareas.
+class VersionUsuario(Base):
+    __tablename__ = "versiones_usuario"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
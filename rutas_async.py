@@ -0,0 +1,95 @@
+# rutas_async.py
+# Rutas de tareas en modo async (DATABASE_ASYNC). main.py las registra en lugar de sus equivalentes
+# síncronas; cualquier ruta que aún no esté aquí sigue atendida por la versión síncrona.
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from typing import List, Optional
+
+import crud_async, schemas, auth, etags, eventos, serializacion
+from database import get_async_db, get_async_read_db
+
+router = APIRouter()
+
+# --- Tareas ---
+@router.post("/tareas", response_model=schemas.Tarea, tags=["Tareas"])
+async def crear_una_tarea(tarea: schemas.TareaCreacion, db=Depends(get_async_db), current_user: auth.Principal = Depends(auth.get_current_user_async)):
+    db_tarea = await crud_async.create_tarea(db=db, tarea=tarea, user_id=current_user.id, user_email=current_user.email)
+    eventos.publicar([current_user.id], "tarea_creada", tarea=db_tarea)
+    return db_tarea
+
+@router.get("/tareas", response_model=List[schemas.Tarea], tags=["Tareas"])
+async def leer_tareas_del_usuario(response: Response, completada: Optional[bool] = None,
+                                  alcance: schemas.AlcanceTareas = schemas.AlcanceTareas.todas,
+                                  despues_de: Optional[int] = Query(None, ge=0, description="Cursor: id de la última tarea de la página anterior"),
+                                  limite: int = Query(100, ge=1, le=500), if_none_match: Optional[str] = Header(None),
+                                  db=Depends(get_async_read_db), current_user: auth.Principal = Depends(auth.get_current_user_async)):
+    etag = etags.etag_tareas(current_user.id, await crud_async.get_version_usuario(db, current_user.id), "lista", completada, alcance.value, despues_de, limite)
+    if etags.coincide(if_none_match, etag): return etags.no_modificado(etag)
+    tareas = await crud_async.get_tareas_for_user(db, user_id=current_user.id, completada=completada, alcance=alcance, despues_de=despues_de, limite=limite)
+    if len(tareas) == limite: response.headers["X-Siguiente-Cursor"] = str(tareas[-1]["id"])
+    etags.marcar(response, etag)
+    return serializacion.respuesta(tareas, response)
+
+# Mismo esquema que main.py: autorización dentro de la sentencia y diagnóstico solo si no afecta a ninguna fila
+async def _comprobar_edicion(db, tarea_id: int, user_id: int):
+    permiso = await crud_async.get_permiso_tarea(db, tarea_id, user_id)
+    if permiso is None: raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    if not any(permiso): raise HTTPException(status_code=403, detail="No tienes permiso para editar esta tarea")
+
+async def _error_asignacion(db, tarea_id: int, user_id: int, email: str, quitar: bool):
+    creator_id, id_usuario = await crud_async.diagnosticar_asignacion(db, tarea_id, email)
+    if creator_id is None: raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    if creator_id != user_id:
+        raise HTTPException(status_code=403, detail=f"Solo el creador puede {'quitar asignaciones' if quitar else 'asignar usuarios'}")
+    if id_usuario is None: raise HTTPException(status_code=404, detail=f"Usuario a {'quitar' if quitar else 'asignar'} no encontrado")
+    if quitar and id_usuario == creator_id: raise HTTPException(status_code=400, detail="No se puede quitar al creador de la tarea")
+
+async def _actualizar(tarea_id: int, cambios: dict, db, current_user: auth.Principal):
+    if not cambios:
+        await _comprobar_edicion(db, tarea_id, current_user.id)
+        return await crud_async.get_tarea_dict(db, tarea_id)
+    db_tarea = await crud_async.update_tarea(db, tarea_id, current_user.id, cambios)
+    if db_tarea is None:
+        await _comprobar_edicion(db, tarea_id, current_user.id)
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    eventos.publicar([u["id"] for u in db_tarea["assignees"]] + [db_tarea["creator_id"]], "tarea_actualizada", tarea_id=tarea_id, cambios=cambios)
+    return db_tarea
+
+@router.put("/tareas/{tarea_id}", response_model=schemas.Tarea, tags=["Tareas"])
+async def actualizar_una_tarea(tarea_id: int, tarea_data: schemas.TareaCreacion, db=Depends(get_async_db), current_user: auth.Principal = Depends(auth.get_current_user_async)):
+    return await _actualizar(tarea_id, tarea_data.dict(), db, current_user)
+
+@router.patch("/tareas/{tarea_id}", response_model=schemas.Tarea, tags=["Tareas"])
+async def actualizar_parcialmente_una_tarea(tarea_id: int, tarea_data: schemas.TareaActualizacionParcial, db=Depends(get_async_db),
+                                            current_user: auth.Principal = Depends(auth.get_current_user_async)):
+    return await _actualizar(tarea_id, tarea_data.dict(exclude_unset=True), db, current_user)
+
+@router.delete("/tareas/{tarea_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Tareas"])
+async def eliminar_una_tarea(tarea_id: int, db=Depends(get_async_db), current_user: auth.Principal = Depends(auth.get_current_user_async)):
+    destinatarios = await crud_async.delete_tarea(db, tarea_id, current_user.id)
+    if destinatarios is None:
+        if await crud_async.get_permiso_tarea(db, tarea_id, current_user.id) is None: raise HTTPException(status_code=404, detail="Tarea no encontrada")
+        raise HTTPException(status_code=403, detail="Solo el creador puede eliminar la tarea")
+    eventos.publicar(destinatarios, "tarea_eliminada", tarea_id=tarea_id)
+    return
+
+# --- Asignaciones ---
+@router.post("/tareas/{tarea_id}/assign", response_model=schemas.Tarea, tags=["Asignaciones"])
+async def asignar_usuario(tarea_id: int, request: schemas.AssignRequest, db=Depends(get_async_db), current_user: auth.Principal = Depends(auth.get_current_user_async)):
+    db_tarea = await crud_async.assign_user_to_task(db, tarea_id, current_user.id, request.email)
+    if db_tarea is None:
+        await _error_asignacion(db, tarea_id, current_user.id, request.email, quitar=False)
+        return await crud_async.get_tarea_dict(db, tarea_id)
+    usuario = next(u for u in db_tarea["assignees"] if u["email"] == request.email)
+    eventos.publicar([u["id"] for u in db_tarea["assignees"]] + [db_tarea["creator_id"]], "asignado_agregado", tarea_id=tarea_id, usuario=usuario)
+    return db_tarea
+
+@router.post("/tareas/{tarea_id}/unassign", response_model=schemas.Tarea, tags=["Asignaciones"])
+async def quitar_asignacion(tarea_id: int, request: schemas.AssignRequest, db=Depends(get_async_db), current_user: auth.Principal = Depends(auth.get_current_user_async)):
+    resultado = await crud_async.remove_user_from_task(db, tarea_id, current_user.id, request.email)
+    if resultado is None:
+        await _error_asignacion(db, tarea_id, current_user.id, request.email, quitar=True)
+        return await crud_async.get_tarea_dict(db, tarea_id)
+    db_tarea, quitado = resultado
+    eventos.publicar([u["id"] for u in db_tarea["assignees"]] + [db_tarea["creator_id"], quitado], "asignado_quitado",
+                     tarea_id=tarea_id, usuario={"id": quitado, "email": request.email})
+    return db_tarea
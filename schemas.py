@@ -1,6 +1,7 @@
 # schemas.py
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, validator
 from typing import Optional, List
+from enum import Enum
 
 # --- Schemas para Usuarios ---
 class UserBase(BaseModel):
@@ -23,6 +24,23 @@ class TareaBase(BaseModel):
 class TareaCreacion(TareaBase):
     pass
 
+class TareaActualizacionParcial(BaseModel):
+    # PATCH: solo se modifican los campos presentes en el cuerpo
+    titulo: Optional[str] = None
+    descripcion: Optional[str] = None
+    completada: Optional[bool] = None
+
+    # Optional solo para poder omitirlos: un null explícito dejaría la columna a NULL
+    @validator("titulo", "descripcion", "completada", pre=True)
+    def no_nulo(cls, v):
+        if v is None: raise ValueError("no puede ser null")
+        return v
+
+class AlcanceTareas(str, Enum):
+    todas = "todas"
+    creadas = "creadas"
+    asignadas = "asignadas"
+
 class Tarea(TareaBase):
     id: int
     creator_id: int
@@ -38,6 +56,65 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[EmailStr] = None
 
+class TicketEventos(BaseModel):
+    ticket: str
+    expira_en: int
+
 # --- Schema para Asignaciones ---
 class AssignRequest(BaseModel):
-    email: EmailStr
\ No newline at end of file
+    email: EmailStr
+
+# --- Schemas para Operaciones en Lote ---
+MAX_LOTE = 1000
+
+class LoteCreacion(BaseModel):
+    tareas: List[TareaCreacion]
+
+class TareaActualizacionLote(BaseModel):
+    # Sin el validador de TareaActualizacionParcial: un null en un elemento se informa en su resultado
+    # (422) sin rechazar el lote entero
+    id: int
+    titulo: Optional[str] = None
+    descripcion: Optional[str] = None
+    completada: Optional[bool] = None
+
+class LoteActualizacion(BaseModel):
+    tareas: List[TareaActualizacionLote]
+
+class LoteEliminacion(BaseModel):
+    ids: List[int]
+
+class AsignacionLote(BaseModel):
+    tarea_id: int
+    emails: List[EmailStr]
+
+class LoteAsignacion(BaseModel):
+    asignaciones: List[AsignacionLote]
+
+class ResultadoElementoLote(BaseModel):
+    indice: int
+    id: Optional[int] = None
+    ok: bool
+    status: int
+    detalle: Optional[str] = None
+
+class ResultadoLote(BaseModel):
+    resultados: List[ResultadoElementoLote]
+
+# --- Schemas para Exportación / Importación (NDJSON) ---
+BLOQUE_EXPORTACION = 500
+MAX_ERRORES_IMPORTACION = 1000
+MAX_LINEA_IMPORTACION = 1024 * 1024
+
+class TareaImportacion(TareaCreacion):
+    # Mismo formato que cada línea de /tareas/exportar; id, creator_id y los ids de usuario se ignoran
+    assignees: List[AssignRequest] = []
+
+class ErrorImportacion(BaseModel):
+    linea: int
+    detalle: str
+
+class ResultadoImportacion(BaseModel):
+    importadas: int
+    total_errores: int
+    errores: List[ErrorImportacion]
@@ -0,0 +1,29 @@
+# serializacion.py
+# Respuestas JSON de tareas sin el coste de FastAPI: las lecturas salen de crud ya como dicts con la
+# forma de schemas.Tarea, así que se codifican tal cual en lugar de validarlas otra vez contra el
+# response_model y pasarlas por jsonable_encoder + json. Las rutas siguen declarando response_model,
+# por lo que el esquema OpenAPI no cambia.
+import json
+from typing import Any, Optional
+from fastapi import Response
+
+try:  # orjson es opcional: sin él se usa el json de la biblioteca estándar
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(datos: Any) -> bytes:
+    if orjson is not None: return orjson.dumps(datos)
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class RespuestaJSON(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def respuesta(datos: Any, response: Optional[Response] = None) -> RespuestaJSON:
+    """Codifica `datos` (de confianza, ya con la forma del response_model) conservando las cabeceras
+    que la ruta haya puesto en su `response` (ETag, cursor...), que FastAPI ignora al devolver una Response."""
+    cabeceras = {k: v for k, v in response.headers.items() if k != "content-length"} if response is not None else None
+    return RespuestaJSON(datos, headers=cabeceras)
@@ -28,15 +28,26 @@ document.addEventListener("DOMContentLoaded", () => {
         setTimeout(() => toast.remove(), 4000);
     }
 
+    // Estado local: tareas por id. Se carga una vez y se mantiene con los eventos del servidor
+    const tareas = new Map();
+    let miEmail = null, canal = null, reconexion = null, generacion = 0, usarSSE = !('WebSocket' in window);
+    // Un corte suelto del WebSocket (red, despliegue) no debe dejarnos en SSE para siempre: solo se cambia
+    // tras varios intentos seguidos sin llegar a abrir, reintentando mientras tanto con espera creciente
+    const FALLOS_WS_ANTES_DE_SSE = 3, ESPERA_RECONEXION_MS = 3000, ESPERA_RECONEXION_MAX_MS = 30000;
+    let fallosWS = 0;
+
     const saveToken = token => localStorage.setItem('authToken', token), getToken = () => localStorage.getItem('authToken'), clearToken = () => localStorage.removeItem('authToken');
     
     function updateUI() {
         const token = getToken();
         if (token) {
             authContainer.classList.add("is-hidden"); appContainer.classList.remove("is-hidden");
-            try { const payload = JSON.parse(atob(token.split('.')[1])); userInfo.textContent = `Sesión: ${payload.sub}`; } catch (e) { console.error("Token inválido", e); clearToken(); updateUI(); }
+            try { const payload = JSON.parse(atob(token.split('.')[1])); miEmail = payload.sub; userInfo.textContent = `Sesión: ${payload.sub}`; } catch (e) { console.error("Token inválido", e); clearToken(); updateUI(); return; }
             cargarTareas();
+            conectarEventos();
         } else {
+            desconectarEventos();
+            tareas.clear(); miEmail = null;
             appContainer.classList.add("is-hidden"); authContainer.classList.remove("is-hidden");
         }
     }
@@ -79,11 +90,23 @@ document.addEventListener("DOMContentLoaded", () => {
     logoutButton.addEventListener('click', () => { clearToken(); updateUI(); showToast("Sesión cerrada con éxito."); });
 
     async function cargarTareas() {
-        const response = await apiFetch('/tareas');
-        if (!response || !response.ok) { taskListDiv.innerHTML = '<p>No se pudieron cargar las tareas.</p>'; return; }
-        const tareas = await response.json();
+        // La API pagina por cursor: seguimos X-Siguiente-Cursor hasta la última página
+        const cargadas = [];
+        let cursor = null;
+        do {
+            const response = await apiFetch(cursor ? `/tareas?despues_de=${cursor}` : '/tareas');
+            if (!response || !response.ok) { taskListDiv.innerHTML = '<p>No se pudieron cargar las tareas.</p>'; return; }
+            cargadas.push(...await response.json());
+            cursor = response.headers.get('X-Siguiente-Cursor');
+        } while (cursor);
+        tareas.clear();
+        cargadas.forEach(t => tareas.set(t.id, t));
+        renderTareas();
+    }
+
+    function renderTareas() {
         taskListDiv.innerHTML = "";
-        tareas.forEach(tarea => {
+        [...tareas.values()].sort((a, b) => a.id - b.id).forEach(tarea => {
             const assigneesHtml = tarea.assignees.map(u => `<span class="tag is-info mr-1">${u.email}</span>`).join('');
             const taskCard = document.createElement("div");
             taskCard.className = `box ${tarea.completada ? 'completed' : ''}`;
@@ -101,6 +124,88 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
 
+    // --- Tiempo real: WebSocket, o SSE si no está disponible. Los eventos son deltas sobre `tareas`. ---
+    // El token nunca va en la URL: el WebSocket lo envía como subprotocolo y el SSE usa un ticket de un solo uso.
+    async function conectarEventos(recargar = false) {
+        desconectarEventos();
+        const token = getToken();
+        if (!token) return;
+        const intento = generacion;
+        let abierto = false;
+        // Tras una reconexión se recarga por si se perdieron eventos
+        const alAbrir = () => { if (recargar || abierto) cargarTareas(); abierto = true; if (!usarSSE) fallosWS = 0; };
+        const alCerrar = () => {
+            if (canal === null || !getToken()) return;
+            let espera = ESPERA_RECONEXION_MS;
+            if (!abierto && !usarSSE) {  // el WebSocket no llegó a abrirse
+                fallosWS++;
+                if (fallosWS >= FALLOS_WS_ANTES_DE_SSE) usarSSE = true;
+                else espera = Math.min(ESPERA_RECONEXION_MS * 2 ** (fallosWS - 1), ESPERA_RECONEXION_MAX_MS);
+            }
+            canal = null;
+            // Al reconectar se recarga la lista por si se perdió algún evento mientras tanto
+            reconexion = setTimeout(() => conectarEventos(true), espera);
+        };
+        if (usarSSE) {
+            const response = await apiFetch('/tareas/eventos/ticket', { method: 'POST' });
+            if (intento !== generacion || !getToken()) return;  // desconectado mientras se pedía el ticket
+            if (!response || !response.ok) { reconexion = setTimeout(() => conectarEventos(true), ESPERA_RECONEXION_MS); return; }
+            const { ticket } = await response.json();
+            const fuente = canal = new EventSource(`/tareas/eventos?ticket=${encodeURIComponent(ticket)}`);
+            fuente.onopen = alAbrir;
+            fuente.onmessage = e => aplicarEvento(JSON.parse(e.data));
+            // El ticket ya está consumido: en vez de la reconexión automática de EventSource, se pide otro
+            fuente.onerror = () => { fuente.close(); if (canal === fuente) alCerrar(); };
+        } else {
+            canal = new WebSocket(`${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.host}/ws/tareas`, ['tareas', token]);
+            canal.onopen = alAbrir;
+            canal.onmessage = e => aplicarEvento(JSON.parse(e.data));
+            canal.onclose = alCerrar;
+        }
+    }
+
+    function desconectarEventos() {
+        generacion++;
+        if (reconexion) clearTimeout(reconexion);
+        reconexion = null;
+        const anterior = canal;
+        canal = null;
+        if (anterior) anterior.close();
+    }
+
+    async function aplicarEvento(evento) {
+        switch (evento.tipo) {
+            case 'resync': return cargarTareas();
+            case 'tarea_creada': tareas.set(evento.tarea.id, evento.tarea); break;
+            case 'tarea_actualizada': if (tareas.has(evento.tarea_id)) Object.assign(tareas.get(evento.tarea_id), evento.cambios); break;
+            case 'tarea_eliminada': tareas.delete(evento.tarea_id); break;
+            case 'asignado_agregado': {
+                const t = tareas.get(evento.tarea_id);
+                if (t) { if (!t.assignees.some(u => u.id === evento.usuario.id)) t.assignees.push(evento.usuario); }
+                else {  // nos acaban de asignar una tarea que aún no teníamos
+                    const res = await apiFetch(`/tareas/${evento.tarea_id}`);
+                    if (res && res.ok) { const nueva = await res.json(); tareas.set(nueva.id, nueva); }
+                }
+                break;
+            }
+            case 'asignado_quitado': {
+                if (evento.usuario.email === miEmail) { tareas.delete(evento.tarea_id); break; }
+                const t = tareas.get(evento.tarea_id);
+                if (t) t.assignees = t.assignees.filter(u => u.id !== evento.usuario.id);
+                break;
+            }
+            default: return;
+        }
+        renderTareas();
+    }
+
+    // Aplica en local la tarea devuelta por la API tras una acción propia (sin recargar la lista)
+    async function aplicarRespuesta(response) {
+        const t = await response.json();
+        tareas.set(t.id, t);
+        renderTareas();
+    }
+
     addTaskFab.addEventListener('click', () => {
         taskModalTitle.textContent = "Nueva Tarea";
         taskForm.reset();
@@ -119,7 +224,7 @@ document.addEventListener("DOMContentLoaded", () => {
         } else {
             response = await apiFetch('/tareas', { method: 'POST', body: JSON.stringify(body) });
         }
-        if(response && response.ok) { closeModal(taskModal); cargarTareas(); showToast(`Tarea ${id ? 'actualizada' : 'creada'}.`); } 
+        if(response && response.ok) { closeModal(taskModal); await aplicarRespuesta(response); showToast(`Tarea ${id ? 'actualizada' : 'creada'}.`); } 
         else { showToast("Error al guardar la tarea.", "is-danger"); }
     });
 
@@ -128,11 +233,14 @@ document.addEventListener("DOMContentLoaded", () => {
         if (!button) return;
         const id = button.dataset.id;
         if (button.classList.contains('button-delete')) {
-            if (confirm("¿Estás seguro?")) { await apiFetch(`/tareas/${id}`, { method: 'DELETE' }); cargarTareas(); showToast("Tarea eliminada."); }
+            if (confirm("¿Estás seguro?")) {
+                const response = await apiFetch(`/tareas/${id}`, { method: 'DELETE' });
+                if (response && response.ok) { tareas.delete(Number(id)); renderTareas(); showToast("Tarea eliminada."); }
+            }
         } else if (button.classList.contains('button-complete')) {
             const res = await apiFetch(`/tareas/${id}`); if (!res || !res.ok) return; const t = await res.json();
-            await apiFetch(`/tareas/${id}`, { method: 'PUT', body: JSON.stringify({ ...t, completada: !t.completada }) });
-            cargarTareas();
+            const response = await apiFetch(`/tareas/${id}`, { method: 'PUT', body: JSON.stringify({ ...t, completada: !t.completada }) });
+            if (response && response.ok) await aplicarRespuesta(response);
         } else if (button.classList.contains('button-edit')) {
             const res = await apiFetch(`/tareas/${id}`); if (!res || !res.ok) return; const t = await res.json();
             taskModalTitle.textContent = "Editar Tarea";
@@ -154,7 +262,7 @@ document.addEventListener("DOMContentLoaded", () => {
             showToast("Usuario asignado.");
             document.getElementById('assign-email').value = "";
             closeModal(assignModal);
-            cargarTareas();
+            await aplicarRespuesta(response);
         } else { showToast("Error al asignar usuario.", "is-danger"); }
     });
 
@@ -0,0 +1,32 @@
+# tests/conftest.py
+# La app lee la configuración del entorno al importarse: se apunta a una SQLite temporal antes de importar main.
+import os, sys, tempfile
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tareas-tests-'), 'tests.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.chdir(RAIZ)  # main sirve static/ con ruta relativa
+sys.path.insert(0, RAIZ)
+
+from fastapi.testclient import TestClient
+import main
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+@pytest.fixture
+def cabeceras(client):
+    """Devuelve una función email -> cabeceras Authorization (registra el usuario si no existe)."""
+    def _cabeceras(email: str) -> dict:
+        client.post("/users/register", json={"email": email, "password": "pw"})
+        r = client.post("/token", data={"username": email, "password": "pw"})
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+    return _cabeceras
+
+@pytest.fixture
+def tarea(client, cabeceras):
+    h = cabeceras("creador@example.com")
+    return client.post("/tareas", json={"titulo": "t", "descripcion": "d"}, headers=h).json(), h
@@ -0,0 +1,96 @@
+# tests/test_auth.py
+import asyncio, time
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+import auth, database, models
+
+def _token(cabeceras: dict) -> str:
+    return cabeceras["Authorization"].split(" ", 1)[1]
+
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [time.time()]
+    monkeypatch.setattr(auth.time, "time", lambda: ahora[0])
+    return ahora
+
+def test_cache_lru_expulsa_la_menos_usada():
+    cache = auth.PrincipalCache(max_size=2, ttl_seconds=60)
+    exp = time.time() + 60
+    cache.put("a", auth.Principal(1, "a@example.com"), exp)
+    cache.put("b", auth.Principal(2, "b@example.com"), exp)
+    assert cache.get("a") is not None  # "a" pasa a ser la más reciente
+    cache.put("c", auth.Principal(3, "c@example.com"), exp)
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+
+def test_cache_ttl_limitado_por_exp_del_token(reloj):
+    cache = auth.PrincipalCache(max_size=10, ttl_seconds=300)
+    cache.put("t", auth.Principal(1, "a@example.com"), token_exp=reloj[0] + 5)
+    reloj[0] += 4
+    assert cache.get("t") is not None
+    reloj[0] += 2  # el token ha caducado aunque el TTL de la caché no
+    assert cache.get("t") is None and cache.stats()["size"] == 0
+
+def test_cache_ttl_propio(reloj):
+    cache = auth.PrincipalCache(max_size=10, ttl_seconds=30)
+    cache.put("t", auth.Principal(1, "a@example.com"), token_exp=reloj[0] + 3600)
+    reloj[0] += 31
+    assert cache.get("t") is None
+
+def test_invalidar_usuario_tras_cambiar_email(client, cabeceras):
+    h = cabeceras("antiguo@example.com")
+    yo = client.get("/tareas", headers=h)
+    assert yo.status_code == 200
+    principal = auth.principal_cache.get(_token(h))
+    assert principal is not None
+    with database.SessionLocal() as db:
+        db.execute(update(models.User).where(models.User.id == principal.id).values(email="nuevo@example.com"))
+        db.commit()
+    # Sin invalidar, la caché sigue aceptando el token emitido para el email anterior
+    assert client.get("/tareas", headers=h).status_code == 200
+    auth.invalidate_user(user_id=principal.id)
+    assert auth.principal_cache.get(_token(h)) is None
+    assert client.get("/tareas", headers=h).status_code == 401
+
+def test_invalidar_usuario_por_email(client, cabeceras):
+    h = cabeceras("clave@example.com")
+    assert client.get("/tareas", headers=h).status_code == 200
+    auth.invalidate_user(email="clave@example.com")
+    assert auth.principal_cache.get(_token(h)) is None
+    assert client.get("/tareas", headers=h).status_code == 200  # el usuario sigue existiendo: vuelve a la caché
+
+def test_ticket_no_vale_como_token_ni_al_reves(client, cabeceras):
+    h = cabeceras("ticket@example.com")
+    ticket = client.post("/tareas/eventos/ticket", headers=h).json()["ticket"]
+    with pytest.raises(HTTPException):
+        auth.principal_from_token(ticket)
+    with pytest.raises(HTTPException):
+        auth.principal_from_ticket(_token(h))
+    auth.principal_from_ticket(ticket)
+    with pytest.raises(HTTPException):  # ya consumido
+        auth.principal_from_ticket(ticket)
+
+def test_get_current_user_async(client, cabeceras, monkeypatch):
+    # La suite corre en modo síncrono: se abre un motor async sobre la misma BD de pruebas
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    h = cabeceras("asincrono@example.com")
+    token = _token(h)
+    auth.principal_cache.clear()
+
+    async def escenario():
+        motor = create_async_engine(database._async_url)
+        monkeypatch.setattr(auth, "AsyncSessionLocal", async_sessionmaker(motor, expire_on_commit=False))
+        try:
+            principal = await auth.get_current_user_async(token)
+            aciertos = auth.principal_cache.hits
+            assert await auth.get_current_user_async(token) == principal
+            assert auth.principal_cache.hits == aciertos + 1
+            with pytest.raises(HTTPException) as error:
+                await auth.get_current_user_async(token + "x")
+            assert error.value.status_code == 401
+            return principal
+        finally:
+            await motor.dispose()
+    assert asyncio.run(escenario()).email == "asincrono@example.com"
@@ -0,0 +1,41 @@
+# tests/test_crud.py
+# Caminos genéricos (dialectos sin ON CONFLICT ni índice de texto): sentencias SQL estándar que
+# también ejecuta SQLite, así que se comprueban contra la BD de los tests.
+import crud, database
+
+def test_bump_versiones_sin_on_conflict(client, cabeceras):
+    cabeceras("versiones@example.com")
+    with database.SessionLocal() as db:
+        user_id = crud.get_user_by_email(db, "versiones@example.com").id
+        assert crud.get_version_usuario(db, user_id) == 0
+        for _ in range(2):  # la primera crea la fila, la segunda la incrementa
+            for stmt in crud.stmts_bump_versiones("generico", [user_id]): db.execute(stmt)
+        assert crud.get_version_usuario(db, user_id) == 2
+        db.rollback()
+
+def test_busqueda_generica(client, cabeceras):
+    h = cabeceras("busqueda@example.com")
+    tarea = client.post("/tareas", json={"titulo": "Comprar pan", "descripcion": "d"}, headers=h).json()
+    with database.SessionLocal() as db:
+        filas = db.execute(crud.select_buscar_tareas("generico", tarea["creator_id"], "pan")).all()
+    assert [f.id for f in filas] == [tarea["id"]]
+
+def test_busqueda_generica_comodines_literales(client, cabeceras):
+    h = cabeceras("comodines@example.com")
+    con = client.post("/tareas", json={"titulo": "Subir un 10% el precio", "descripcion": "d"}, headers=h).json()
+    client.post("/tareas", json={"titulo": "Subir un 10 el precio", "descripcion": "d"}, headers=h)
+    client.post("/tareas", json={"titulo": "Revisar a_b", "descripcion": "d"}, headers=h)
+    sin = client.post("/tareas", json={"titulo": "Revisar axb", "descripcion": "d"}, headers=h).json()
+    with database.SessionLocal() as db:
+        buscar = lambda q: [f.id for f in db.execute(crud.select_buscar_tareas("generico", con["creator_id"], q)).all()]
+        assert buscar("10%") == [con["id"]]
+        assert sin["id"] not in buscar("a_b") and len(buscar("a_b")) == 1
+
+def test_asignar_por_email_sin_on_conflict(client, cabeceras, tarea):
+    t, _ = tarea
+    cabeceras("asignado@example.com")
+    with database.SessionLocal() as db:
+        stmt = lambda: crud.stmt_asignar_por_email("generico", t["id"], t["creator_id"], "asignado@example.com")
+        assert db.execute(stmt()).first() is not None
+        assert db.execute(stmt()).first() is None  # ya asignado: NOT EXISTS en lugar de ON CONFLICT
+        db.rollback()
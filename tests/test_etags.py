@@ -0,0 +1,57 @@
+# tests/test_etags.py
+import pytest
+
+@pytest.fixture
+def usuarios(cabeceras, request):
+    # La BD se comparte entre tests: emails únicos por test
+    nombre = request.node.name.replace("[", "-").replace("]", "")
+    return {n: cabeceras(f"{n}-{nombre}@example.com") for n in ("ana", "beto", "otro")}, f"beto-{nombre}@example.com"
+
+def _etag(client, h, ruta="/tareas"):
+    r = client.get(ruta, headers=h)
+    assert r.status_code == 200
+    return r.headers["ETag"]
+
+def test_etag_estable_sin_escrituras_y_304(client, usuarios):
+    u, _ = usuarios
+    client.post("/tareas", json={"titulo": "t", "descripcion": "d"}, headers=u["beto"])
+    etag = _etag(client, u["beto"])
+    assert _etag(client, u["beto"]) == etag
+    r = client.get("/tareas", headers={**u["beto"], "If-None-Match": etag})
+    assert r.status_code == 304 and r.headers["ETag"] == etag and not r.content
+    # Escrituras de un usuario sin relación con las tareas de beto no invalidan su caché
+    client.post("/tareas", json={"titulo": "ajena", "descripcion": "d"}, headers=u["otro"])
+    assert client.get("/tareas", headers={**u["beto"], "If-None-Match": etag}).status_code == 304
+
+def test_etag_tarea_individual_304(client, usuarios):
+    u, _ = usuarios
+    t = client.post("/tareas", json={"titulo": "t", "descripcion": "d"}, headers=u["ana"]).json()
+    etag = _etag(client, u["ana"], f"/tareas/{t['id']}")
+    assert client.get(f"/tareas/{t['id']}", headers={**u["ana"], "If-None-Match": etag}).status_code == 304
+    client.patch(f"/tareas/{t['id']}", json={"completada": True}, headers=u["ana"])
+    assert client.get(f"/tareas/{t['id']}", headers={**u["ana"], "If-None-Match": etag}).status_code == 200
+
+@pytest.mark.parametrize("escritura", ["asignar", "actualizar", "eliminar", "quitar", "lote_actualizar", "lote_eliminar",
+                                       "lote_asignar", "lote_quitar"])
+def test_etag_cambia_con_escrituras_de_otro_usuario_visibles(client, usuarios, escritura):
+    u, email_beto = usuarios
+    ana = u["ana"]
+    t = client.post("/tareas", json={"titulo": "t", "descripcion": "d"}, headers=ana).json()
+    if escritura not in ("asignar", "lote_asignar"):
+        assert client.post(f"/tareas/{t['id']}/assign", json={"email": email_beto}, headers=ana).status_code == 200
+    antes = _etag(client, u["beto"])
+    asignacion = {"asignaciones": [{"tarea_id": t["id"], "emails": [email_beto]}]}
+    r = {
+        "asignar": lambda: client.post(f"/tareas/{t['id']}/assign", json={"email": email_beto}, headers=ana),
+        "actualizar": lambda: client.patch(f"/tareas/{t['id']}", json={"titulo": "nuevo"}, headers=ana),
+        "eliminar": lambda: client.delete(f"/tareas/{t['id']}", headers=ana),
+        "quitar": lambda: client.post(f"/tareas/{t['id']}/unassign", json={"email": email_beto}, headers=ana),
+        "lote_actualizar": lambda: client.post("/tareas/lote/actualizar", json={"tareas": [{"id": t["id"], "titulo": "nuevo"}]}, headers=ana),
+        "lote_eliminar": lambda: client.post("/tareas/lote/eliminar", json={"ids": [t["id"]]}, headers=ana),
+        "lote_asignar": lambda: client.post("/tareas/lote/assign", json=asignacion, headers=ana),
+        "lote_quitar": lambda: client.post("/tareas/lote/unassign", json=asignacion, headers=ana),
+    }[escritura]()
+    assert r.status_code < 400
+    if escritura.startswith("lote"): assert all(e["ok"] for e in r.json()["resultados"])
+    assert client.get("/tareas", headers={**u["beto"], "If-None-Match": antes}).status_code == 200
+    assert _etag(client, u["beto"]) != antes
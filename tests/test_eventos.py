@@ -0,0 +1,107 @@
+# tests/test_eventos.py
+import asyncio, json
+import pytest
+from fastapi import HTTPException
+from starlette.websockets import WebSocketDisconnect
+import auth, eventos
+
+def _token(h: dict) -> str:
+    return h["Authorization"][len("Bearer "):]
+
+def test_ws_con_token_en_subprotocolo(client, tarea, cabeceras):
+    t, h = tarea
+    hb = cabeceras("ws@example.com")
+    with client.websocket_connect("/ws/tareas", subprotocols=["tareas", _token(hb)]) as ws:
+        assert ws.accepted_subprotocol == "tareas"
+        client.post(f"/tareas/{t['id']}/assign", json={"email": "ws@example.com"}, headers=h)
+        evento = ws.receive_json()
+        assert evento["tipo"] == "asignado_agregado" and evento["tarea_id"] == t["id"]
+
+@pytest.mark.parametrize("url,subprotocolos", [("/ws/tareas?token={token}", None), ("/ws/tareas", ["tareas", "malo"]),
+                                               ("/ws/tareas", ["otro", "{token}"])])
+def test_ws_rechaza_credenciales_fuera_del_subprotocolo(client, cabeceras, url, subprotocolos):
+    token = _token(cabeceras("ws@example.com"))
+    subprotocolos = [p.format(token=token) for p in subprotocolos] if subprotocolos else None
+    with pytest.raises(WebSocketDisconnect) as error:
+        with client.websocket_connect(url.format(token=token), subprotocols=subprotocolos) as ws: ws.receive_json()
+    assert error.value.code == 1008
+
+def test_ticket_sse_un_solo_uso(client, cabeceras):
+    # TestClient no entrega un stream SSE hasta que termina, así que el consumo se comprueba en auth
+    h = cabeceras("sse@example.com")
+    ticket = client.post("/tareas/eventos/ticket", headers=h).json()["ticket"]
+    assert client.get("/tareas", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+    principal, sesion_exp = auth.principal_from_ticket(ticket)
+    assert principal.email == "sse@example.com" and sesion_exp == auth.token_expiration(_token(h))
+    with pytest.raises(HTTPException):
+        auth.principal_from_ticket(ticket)
+    assert client.get(f"/tareas/eventos?ticket={ticket}").status_code == 401
+
+def test_sse_sin_credenciales_ni_token_en_query(client, cabeceras):
+    token = _token(cabeceras("sse@example.com"))
+    assert client.get(f"/tareas/eventos?token={token}").status_code == 401
+
+class _RedisFalso:
+    """Sustituto de redis.asyncio.Redis. publish falla siempre; la primera suscripción se corta con un
+    error y las siguientes entregan lo que haya en `mensajes`."""
+    def __init__(self):
+        self.suscripciones, self.cerrados, self.mensajes = 0, [], asyncio.Queue()
+    def pubsub(self): return _PubSubFalso(self)
+    async def publish(self, canal, datos): raise ConnectionError("Redis caído")
+    async def aclose(self): self.cerrados.append("cliente")
+
+class _PubSubFalso:
+    def __init__(self, redis): self.redis = redis
+    async def subscribe(self, canal): self.redis.suscripciones += 1
+    async def listen(self):
+        if self.redis.suscripciones == 1: raise ConnectionError("conexión perdida")
+        while True: yield {"type": "message", "data": await self.redis.mensajes.get()}
+    async def aclose(self): self.redis.cerrados.append("pubsub")
+
+@pytest.fixture
+def redis_falso(monkeypatch):
+    redis = _RedisFalso()
+    monkeypatch.setattr(eventos, "redis_async", type("modulo", (), {"Redis": type("Redis", (), {"from_url": staticmethod(lambda url: redis)})}))
+    monkeypatch.setattr(eventos, "ESPERA_REDIS_MIN_S", 0.01)
+    return redis
+
+def test_broker_redis_caido_entrega_local_sin_bloquear(redis_falso):
+    async def escenario():
+        broker = eventos.BrokerRedis("redis://caido")
+        await broker.iniciar()
+        suscripcion = broker.suscribir(7)
+        # Desde un hilo, como las rutas síncronas; publicar() vuelve sin esperar a Redis
+        await asyncio.to_thread(broker.publicar, [7], {"tipo": "x"})
+        evento = await asyncio.wait_for(suscripcion.siguiente(), timeout=1)
+        await broker.detener()
+        return evento
+    assert asyncio.run(escenario()) == {"tipo": "x"}
+
+def test_broker_redis_se_resuscribe_tras_un_error(redis_falso):
+    async def escenario():
+        broker = eventos.BrokerRedis("redis://inestable")
+        suscripcion = broker.suscribir(7)
+        await broker.iniciar()
+        # Al recuperar la suscripción, resync (se pueden haber perdido eventos) y luego los mensajes nuevos
+        assert await asyncio.wait_for(suscripcion.siguiente(), timeout=1) == eventos.RESYNC
+        await redis_falso.mensajes.put(json.dumps({"user_ids": [7], "evento": {"tipo": "y"}}))
+        evento = await asyncio.wait_for(suscripcion.siguiente(), timeout=1)
+        await broker.detener()
+        return evento
+    assert asyncio.run(escenario()) == {"tipo": "y"}
+    assert redis_falso.suscripciones == 2
+    assert redis_falso.cerrados == ["pubsub", "pubsub", "cliente"]
+
+def test_publicar_no_propaga_errores_del_broker(monkeypatch):
+    def fallar(user_ids, evento): raise ConnectionError("Redis caído")
+    monkeypatch.setattr(eventos.broker, "publicar", fallar)
+    eventos.publicar([1], "tarea_eliminada", tarea_id=1)
+
+def test_importacion_publica_un_solo_resync(client, cabeceras, monkeypatch):
+    h = cabeceras("importa@example.com")
+    publicados = []
+    monkeypatch.setattr(eventos, "publicar", lambda user_ids, tipo, **datos: publicados.append((set(user_ids), tipo)))
+    cuerpo = "\n".join(json.dumps({"titulo": f"Importada {i}", "descripcion": "d"}) for i in range(3)) + "\n{no es json\n"
+    r = client.post("/tareas/importar", params={"lote": 1}, content=cuerpo, headers={**h, "Content-Type": "application/x-ndjson"})
+    assert r.status_code == 200 and r.json()["importadas"] == 3 and r.json()["total_errores"] == 1
+    assert [tipo for _, tipo in publicados] == ["resync"]
@@ -0,0 +1,27 @@
+# tests/test_hashing.py
+from threading import BoundedSemaphore
+from passlib.hash import bcrypt
+from sqlalchemy import select, update
+import database, hashing, models
+
+def test_pool_de_hashing_lleno_responde_503(client, cabeceras, monkeypatch):
+    cabeceras("ocupado@example.com")
+    lleno = BoundedSemaphore(1)
+    lleno.acquire()
+    monkeypatch.setattr(hashing, "_slots", lleno)
+    r = client.post("/token", data={"username": "ocupado@example.com", "password": "pw"})
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert client.post("/users/register", json={"email": "ocupado2@example.com", "password": "pw"}).status_code == 503
+
+def test_login_rehashea_con_otro_coste(client, cabeceras):
+    cabeceras("coste@example.com")
+    otro_coste = hashing.BCRYPT_ROUNDS + 1
+    with database.SessionLocal() as db:
+        db.execute(update(models.User).where(models.User.email == "coste@example.com")
+                   .values(hashed_password=bcrypt.using(rounds=otro_coste).hash("pw")))
+        db.commit()
+    assert client.post("/token", data={"username": "coste@example.com", "password": "pw"}).status_code == 200
+    with database.SessionLocal() as db:
+        guardado = db.execute(select(models.User.hashed_password).where(models.User.email == "coste@example.com")).scalar_one()
+    assert bcrypt.from_string(guardado).rounds == hashing.BCRYPT_ROUNDS
+    assert hashing.verify_password("pw", guardado)
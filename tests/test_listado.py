@@ -0,0 +1,49 @@
+# tests/test_listado.py
+import pytest
+
+@pytest.fixture
+def escenario(client, cabeceras, request):
+    """ana crea 4 tareas (2 completadas) y asigna 2 a beto; beto crea 1 propia. Usuarios nuevos en cada test."""
+    sufijo = request.node.name.replace("_", "")
+    email_beto = f"beto.{sufijo}@example.com"
+    ana, beto = cabeceras(f"ana.{sufijo}@example.com"), cabeceras(email_beto)
+    ids = [client.post("/tareas", json={"titulo": f"a{i}", "descripcion": "d", "completada": i % 2 == 1}, headers=ana).json()["id"]
+           for i in range(4)]
+    for tarea_id in ids[1:3]:
+        client.post(f"/tareas/{tarea_id}/assign", json={"email": email_beto}, headers=ana)
+    propia = client.post("/tareas", json={"titulo": "b", "descripcion": "d"}, headers=beto).json()["id"]
+    return ana, beto, ids, propia
+
+def _ids(client, h, **params):
+    return [t["id"] for t in client.get("/tareas", params=params, headers=h).json()]
+
+def test_alcances(client, escenario):
+    _, beto, ids, propia = escenario
+    assert _ids(client, beto) == sorted([ids[1], ids[2], propia])
+    assert _ids(client, beto, alcance="creadas") == [propia]
+    assert _ids(client, beto, alcance="asignadas") == [ids[1], ids[2], propia]  # el creador figura como asignado
+
+def test_filtro_completada(client, escenario):
+    ana, beto, ids, propia = escenario
+    assert _ids(client, ana, completada=True) == [ids[1], ids[3]]
+    assert _ids(client, beto, completada=False) == [ids[2], propia]
+    assert _ids(client, beto, completada=True, alcance="asignadas") == [ids[1]]
+
+def test_paginacion_por_cursor(client, escenario):
+    _, beto, ids, propia = escenario
+    esperadas, vistas, cursor = sorted([ids[1], ids[2], propia]), [], None
+    while True:
+        params = {"limite": 2, **({"despues_de": cursor} if cursor is not None else {})}
+        r = client.get("/tareas", params=params, headers=beto)
+        vistas += [t["id"] for t in r.json()]
+        cursor = r.headers.get("X-Siguiente-Cursor")
+        if cursor is None: break
+        assert int(cursor) == vistas[-1]
+    assert vistas == esperadas
+
+def test_cursor_en_cada_rama(client, escenario):
+    # Con el cursor entre las tareas asignadas y las propias, cada rama del UNION debe respetarlo
+    _, beto, ids, propia = escenario
+    assert _ids(client, beto, despues_de=ids[1]) == [ids[2], propia]
+    assert _ids(client, beto, despues_de=ids[2], limite=1) == [propia]
+    assert _ids(client, beto, despues_de=propia) == []
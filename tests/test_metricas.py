@@ -0,0 +1,30 @@
+# tests/test_metricas.py
+import re
+import metricas
+
+def _valor(texto: str, serie: str) -> float:
+    m = re.search(rf"^{re.escape(serie)} (\S+)$", texto, re.MULTILINE)
+    assert m, f"falta la serie {serie}"
+    return float(m.group(1))
+
+def test_metrics_incluye_latencia_y_sql_por_peticion(client, cabeceras):
+    h = cabeceras("metricas@example.com")
+    antes = client.get("/metrics").text
+    assert client.get("/tareas", headers=h).status_code == 200
+    texto = client.get("/metrics").text
+    etiquetas = 'method="GET",ruta="/tareas"'
+    cuenta_antes = lambda serie: _valor(antes, serie) if serie in antes else 0
+    assert _valor(texto, f'http_request_duration_seconds_count{{{etiquetas},status="200"}}') \
+        == cuenta_antes(f'http_request_duration_seconds_count{{{etiquetas},status="200"}}') + 1
+    assert _valor(texto, f"http_request_sql_queries_count{{{etiquetas}}}") == cuenta_antes(f"http_request_sql_queries_count{{{etiquetas}}}") + 1
+    # La lectura de la lista hace al menos una consulta (versión para el ETag y tareas)
+    assert _valor(texto, f"http_request_sql_queries_sum{{{etiquetas}}}") >= 1
+    assert "# TYPE http_request_sql_queries histogram" in texto and "# TYPE http_request_duration_seconds histogram" in texto
+
+def test_server_timing_cuenta_las_consultas(client, cabeceras):
+    h = cabeceras("timing@example.com")
+    cabecera = client.get("/tareas", headers=h).headers["Server-Timing"]
+    assert re.search(r'db;dur=[\d.]+;desc="[1-9]\d* sql"', cabecera)
+
+def test_normalizar_sql_agrupa_por_forma():
+    assert metricas.normalizar_sql("SELECT * FROM t WHERE id = 5") == metricas.normalizar_sql("SELECT * FROM t WHERE id = 7")
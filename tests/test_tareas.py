@@ -0,0 +1,38 @@
+# tests/test_tareas.py
+import pytest
+import schemas
+
+@pytest.mark.parametrize("campo", ["titulo", "descripcion", "completada"])
+def test_patch_rechaza_null(client, tarea, campo):
+    t, h = tarea
+    r = client.patch(f"/tareas/{t['id']}", json={campo: None}, headers=h)
+    assert r.status_code == 422
+    assert client.get(f"/tareas/{t['id']}", headers=h).json()[campo] == t[campo]
+
+def test_patch_solo_campos_enviados(client, tarea):
+    t, h = tarea
+    r = client.patch(f"/tareas/{t['id']}", json={"completada": True}, headers=h)
+    assert r.status_code == 200
+    assert r.json()["completada"] is True and r.json()["titulo"] == t["titulo"]
+
+def test_lote_actualizar_null_por_elemento(client, tarea):
+    t, h = tarea
+    r = client.post("/tareas/lote/actualizar", json={"tareas": [{"id": t["id"], "titulo": None}, {"id": t["id"], "completada": True}]}, headers=h)
+    assert r.status_code == 200
+    primero, segundo = r.json()["resultados"]
+    assert not primero["ok"] and primero["status"] == 422 and "titulo" in primero["detalle"]
+    assert segundo["ok"]
+    assert client.get(f"/tareas/{t['id']}", headers=h).json()["titulo"] == t["titulo"]
+
+@pytest.mark.parametrize("ruta", ["/tareas/lote/assign", "/tareas/lote/unassign"])
+def test_lote_asignaciones_vacias_cuentan_para_el_limite(client, tarea, ruta):
+    t, h = tarea
+    asignaciones = [{"tarea_id": t["id"], "emails": []}] * (schemas.MAX_LOTE + 1)
+    r = client.post(ruta, json={"asignaciones": asignaciones}, headers=h)
+    assert r.status_code == 400
+
+@pytest.mark.parametrize("q", [" ", "   ", "\t", '"', "*", "-", "()", "ñ"])
+def test_buscar_sin_terminos_utiles(client, tarea, q):
+    _, h = tarea
+    r = client.get("/tareas/buscar", params={"q": q}, headers=h)
+    assert r.status_code == 200 and isinstance(r.json(), list)